@@ -0,0 +1,267 @@
+"""Benchmarks de los loaders, el preprocesado y el renderizado de pestañas.
+
+Genera ligas sintéticas (fake_biwenger.generar_liga) y mide cada etapa sin red:
+un cliente en memoria devuelve los payloads ya serializados, así que se mide
+el parseo JSON y la construcción de frames, no la latencia. Guarda tiempos y
+pico de memoria en un JSON para comparar ejecuciones.
+
+Uso:
+    python benchmarks/bench_pipeline.py                      # todos los escenarios
+    python benchmarks/bench_pipeline.py --scenarios small medium
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/bench-XXXX.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+
+import data_loader as dl
+from clause_log import ClauseLog
+from clause_optimizer import LIMITES_POSICION, MAX_POR_POSICION, candidatos, clausulazos_por_propietario, optimizar
+from fake_biwenger import generar_liga
+from forecast import pronosticar
+from lineups import mejores_onces
+from pipeline import unir_jugadores
+from preprocessing import horas_restantes, preparar
+from refresh_schedule import TZ
+from snapshots import Snapshot, snapshot_id
+from table_renderer import tabla_clausulas
+
+# (managers, jugadores, entradas del tablón)
+SCENARIOS = {
+    "small": (10, 600, 50),
+    "league": (20, 600, 100),  # liga completa de Biwenger
+    "medium": (100, 5_000, 1_000),
+    "large": (1_000, 20_000, 10_000),
+}
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Presupuestos (ms, mínimo de las repeticiones) por escenario y etapa: el
+# optimizador se ejecuta en cada cambio de filtro de su pestaña
+PRESUPUESTOS_MS = {
+    ("league", "clause_optimizer"): 100,
+    ("league", "clause_optimizer_max"): 100,
+}
+
+
+# ==============================
+# CLIENTE EN MEMORIA
+# ==============================
+class _Respuesta:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, body: bytes):
+        self.content = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class PayloadClient:
+    """Imita BiwengerClient respondiendo con payloads sintéticos ya serializados."""
+
+    def __init__(self, payloads: dict):
+        self._league = json.dumps(payloads["league"]).encode()
+        self._competition = json.dumps(payloads["competition"]).encode()
+        self._users = {uid: json.dumps(squad).encode() for uid, squad in payloads["users"].items()}
+        self._board = payloads["board"]
+
+    def _body(self, url: str) -> bytes:
+        ruta, query = urlparse(url).path, parse_qs(urlparse(url).query)
+        if ruta.endswith("/competitions/la-liga/data"):
+            return self._competition
+        if ruta.endswith("/league"):
+            return self._league
+        if "/board" in ruta:
+            offset, limit = int(query["offset"][0]), int(query["limit"][0])
+            return json.dumps({"data": self._board[offset:offset + limit]}).encode()
+        if "/user/" in ruta:
+            return self._users[int(ruta.rsplit("/", 1)[1])]
+        raise KeyError(url)
+
+    def get(self, url, **kwargs):
+        return _Respuesta(self._body(url))
+
+    def get_json(self, url, ttl=None, **kwargs):
+        return json.loads(self._body(url))
+
+    def post(self, url, **kwargs):
+        return _Respuesta(b'{"token": "bench"}')
+
+
+# ==============================
+# MEDICIÓN
+# ==============================
+def medir(fn, repeat: int):
+    """Devuelve (resultado, tiempos en segundos, pico de memoria en MB)."""
+    tiempos = []
+    resultado = None
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        resultado = fn()
+        tiempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    fn()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, tiempos, pico / 1e6
+
+
+def _filas(resultado):
+    if isinstance(resultado, pd.DataFrame):
+        return len(resultado)
+    if isinstance(resultado, str):
+        return resultado.count("<tr>") - 1
+    return None
+
+
+def ejecutar_escenario(nombre: str, managers: int, players: int, board: int, repeat: int) -> list:
+    payloads = generar_liga(managers, players, board, seed=0)
+    client = PayloadClient(payloads)
+    user_ids = list(payloads["users"])
+    filas = []
+
+    def etapa(stage, fn):
+        resultado, tiempos, pico = medir(fn, repeat)
+        filas.append({
+            "scenario": nombre, "managers": managers, "players": players, "board": board,
+            "stage": stage, "rows": _filas(resultado),
+            "min_s": min(tiempos), "median_s": statistics.median(tiempos), "peak_mb": round(pico, 3),
+        })
+        print(f"  {stage:<22} {min(tiempos) * 1000:10.2f} ms  {pico:8.2f} MB")
+        return resultado
+
+    print(f"{nombre}: {managers} managers, {players} jugadores, {board} entradas")
+    df_liga, df_usuarios = etapa("get_league_data", lambda: dl.get_league_data(1, "t", 1, client=client))
+    df_publicos = etapa("get_public_players", lambda: dl.get_public_players(client=client))
+    df_propios = etapa("get_all_user_players", lambda: dl.get_all_user_players(1, user_ids, 1, "t", client=client))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df_clausulas = etapa(
+            "clause_log_ingest",
+            lambda: ClauseLog(Path(tmp) / f"{time.perf_counter_ns()}.parquet").update(1, 1, "t", client=client),
+        )
+
+    df_jugadores = etapa("merge", lambda: unir_jugadores(df_publicos, df_propios, df_usuarios))
+
+    ahora = datetime.now(TZ)
+    snap = Snapshot(snapshot_id(ahora), ahora, df_liga, df_usuarios, df_jugadores, df_clausulas)
+    datos = etapa("preparar", lambda: preparar(snap, snap, TZ))
+
+    # Previsión sobre 180 días de precios (paseo aleatorio) para todos los jugadores
+    rng = np.random.default_rng(0)
+    precios = np.exp(np.cumsum(rng.normal(0, 0.02, (players, 180)), axis=1)) * 1e6
+    etapa("forecast", lambda: pronosticar(precios, 7))
+
+    etapa("lineups", lambda: mejores_onces(datos.jugadores).resumen)
+
+    ts = pd.Timestamp(ahora)
+    etapa("unlock_scan", lambda: datos.jugadores[horas_restantes(datos.jugadores, ts) <= 48])
+    df_tab1 = etapa("unlock_index", lambda: datos.desbloqueos.hasta_horas(ts, 48))
+    df_tab1 = df_tab1.assign(Horas_restantes=horas_restantes(df_tab1, ts))
+
+    # Optimizador sobre todas las cláusulas que se desbloquean en 48 h, con un presupuesto holgado
+    df_candidatos = candidatos(df_tab1, user_ids[0])
+    recibidos = clausulazos_por_propietario(df_clausulas, ts)
+    etapa("clause_optimizer", lambda: optimizar(df_candidatos, 200_000_000, "puntos", LIMITES_POSICION, recibidos).jugadores)
+    # Peor caso de la pestaña: todas las cláusulas y el máximo por posición que acepta la interfaz
+    df_todas = candidatos(datos.desbloqueos.antes_de(ts + pd.Timedelta(days=365)), user_ids[0])
+    limites_max = dict.fromkeys(LIMITES_POSICION, MAX_POR_POSICION)
+    etapa("clause_optimizer_max", lambda: optimizar(df_todas, 500_000_000, "puntos", limites_max, recibidos).jugadores)
+
+    etapa("render_tab1", lambda: tabla_clausulas(df_tab1, True).to_html(escape=False, index=False))
+    etapa("render_owned", lambda: tabla_clausulas(datos.desbloqueos.antes_de(ts + pd.Timedelta(days=365))).to_html(escape=False, index=False))
+    return filas
+
+
+# ==============================
+# RESULTADOS
+# ==============================
+def _metadata() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def presupuestos(resultados: list) -> bool:
+    """Imprime las etapas que superan PRESUPUESTOS_MS; False si alguna lo hace."""
+    ok = True
+    for r in resultados:
+        limite = PRESUPUESTOS_MS.get((r["scenario"], r["stage"]))
+        if limite is not None and r["min_s"] * 1000 > limite:
+            print(f"  {r['scenario']:<7} {r['stage']:<22} {r['min_s'] * 1000:.1f} ms SUPERA {limite} ms")
+            ok = False
+    return ok
+
+
+def comparar(actual: list, anterior_path: str, umbral: float) -> bool:
+    """Imprime la variación respecto a una ejecución anterior; False si hay regresiones."""
+    anterior = {(r["scenario"], r["stage"]): r for r in json.loads(Path(anterior_path).read_text())["results"]}
+    ok = True
+    print(f"\nComparación con {anterior_path} (umbral +{umbral:.0%})")
+    for r in actual:
+        previo = anterior.get((r["scenario"], r["stage"]))
+        if previo is None or not previo["min_s"]:
+            continue
+        ratio = r["min_s"] / previo["min_s"]
+        marca = "REGRESIÓN" if ratio > 1 + umbral else ""
+        ok &= not marca
+        print(f"  {r['scenario']:<7} {r['stage']:<22} x{ratio:5.2f} {marca}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline de datos de Biwenger")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3, help="repeticiones por etapa (se guarda mínimo y mediana)")
+    parser.add_argument("--output", help="fichero JSON de resultados (por defecto benchmarks/results/bench-<fecha>.json)")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="empeoramiento relativo que cuenta como regresión")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for nombre in args.scenarios:
+        resultados += ejecutar_escenario(nombre, *SCENARIOS[nombre], repeat=args.repeat)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"metadata": _metadata(), "results": resultados}, indent=1))
+    print(f"\nResultados guardados en {output}")
+
+    ok = presupuestos(resultados)
+    if args.compare:
+        ok &= comparar(resultados, args.compare, args.threshold)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
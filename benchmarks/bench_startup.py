@@ -0,0 +1,125 @@
+"""Benchmark del arranque en frío de streamlit_app.py.
+
+Cada medida se hace en un intérprete nuevo, como en un contenedor recién
+arrancado. Las sentencias import de nivel superior se leen de la propia app
+(ast), de modo que el benchmark sigue a la app cuando se reordenan:
+
+- first_paint: imports anteriores a st.title, lo que tarda en pintarse la página.
+- app_imports: todos los imports de nivel superior de la app.
+- charts / descarga: lo que se carga después, solo en las pestañas con
+  gráficas o cuando la app descarga datos ella misma.
+
+Los presupuestos son del tiempo que añade la app sobre `import streamlit`
+(que no depende de ella y varía mucho entre máquinas). Falla si first_paint o
+app_imports los superan, o si plotly.express o requests se cargan al arrancar.
+
+Uso:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10 --compare benchmarks/results/startup-XXXX.json
+"""
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from bench_pipeline import RESULTS_DIR, _metadata, comparar
+
+ROOT = Path(__file__).resolve().parents[1]
+APP = ROOT / "streamlit_app.py"
+
+# Presupuestos en frío: ms sobre `import streamlit` (mínimo de las repeticiones)
+PRESUPUESTOS = {"first_paint": 50, "app_imports": 800}
+# Módulos que no deben cargarse al arrancar
+DIFERIDOS = ("plotly.express", "requests")
+
+_PLANTILLA = """
+import json, sys, time
+t = time.perf_counter()
+{codigo}
+print(json.dumps({{"s": time.perf_counter() - t, "modulos": [m for m in {diferidos!r} if m in sys.modules]}}))
+"""
+
+
+def imports_app(app: Path = APP) -> tuple:
+    """Código de los imports de nivel superior de la app: (antes de st.title, todos)."""
+    fuente = app.read_text(encoding="utf-8")
+    antes, todos, titulo = [], [], False
+    for nodo in ast.parse(fuente).body:
+        if isinstance(nodo, ast.Expr) and "st.title" in ast.get_source_segment(fuente, nodo):
+            titulo = True
+        if isinstance(nodo, (ast.Import, ast.ImportFrom)):
+            codigo = ast.get_source_segment(fuente, nodo)
+            todos.append(codigo)
+            if not titulo:
+                antes.append(codigo)
+    return "\n".join(antes), "\n".join(todos)
+
+
+def medir(codigo: str, repeat: int) -> tuple:
+    """Segundos de cada repetición (intérprete nuevo) y módulos diferidos que se cargaron."""
+    tiempos, cargados = [], set()
+    for _ in range(repeat):
+        salida = subprocess.run(
+            [sys.executable, "-c", _PLANTILLA.format(codigo=codigo, diferidos=DIFERIDOS)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        resultado = json.loads(salida.stdout.strip().splitlines()[-1])
+        tiempos.append(resultado["s"])
+        cargados.update(resultado["modulos"])
+    return tiempos, sorted(cargados)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del arranque en frío de la app")
+    parser.add_argument("--repeat", type=int, default=5, help="intérpretes nuevos por medida (se guarda mínimo y mediana)")
+    parser.add_argument("--output", help="fichero JSON de resultados (por defecto benchmarks/results/startup-<fecha>.json)")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="empeoramiento relativo que cuenta como regresión")
+    args = parser.parse_args(argv)
+
+    antes_titulo, todos = imports_app()
+    etapas = {
+        "streamlit": "import streamlit",
+        "first_paint": antes_titulo,
+        "app_imports": todos,
+        "charts": f"{todos}\nimport charts",
+        "descarga": f"{todos}\nimport pipeline, token_manager",
+    }
+
+    resultados, ok, base = [], True, None
+    print(f"Arranque en frío de {APP.name} ({args.repeat} repeticiones)")
+    for etapa, codigo in etapas.items():
+        tiempos, cargados = medir(codigo, args.repeat)
+        base = min(tiempos) if base is None else base
+        extra_ms = (min(tiempos) - base) * 1000
+        presupuesto = PRESUPUESTOS.get(etapa)
+        resultados.append({
+            "scenario": "cold", "stage": etapa, "min_s": min(tiempos), "median_s": statistics.median(tiempos),
+            "extra_ms": extra_ms, "budget_ms": presupuesto, "deferred_loaded": cargados,
+        })
+
+        marca = ""
+        if presupuesto is not None and extra_ms > presupuesto:
+            marca = f"SUPERA {presupuesto} ms"
+        if etapa in ("first_paint", "app_imports") and cargados:
+            marca += f" carga {', '.join(cargados)}"
+        ok &= not marca
+        print(f"  {etapa:<12} {min(tiempos) * 1000:8.1f} ms  (+{extra_ms:6.1f} sobre streamlit) {marca}")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"startup-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"metadata": _metadata(), "results": resultados}, indent=1))
+    print(f"\nResultados guardados en {output}")
+
+    if args.compare:
+        ok &= comparar(resultados, args.compare, args.threshold)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
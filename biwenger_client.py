@@ -0,0 +1,117 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import anotar
+from request_scheduler import PRIORIDAD_NORMAL, RequestScheduler
+
+# ==============================
+# CONFIGURACIÓN POR DEFECTO
+# ==============================
+# (conexión, lectura) en segundos
+DEFAULT_TIMEOUT = (5, 30)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_POOL_SIZE = 16
+
+RETRY_STATUS = (500, 502, 503, 504)
+
+
+# ==============================
+# CLIENTE HTTP
+# ==============================
+class BiwengerClient:
+    """Cliente HTTP compartido por todas las funciones de data_loader.
+
+    Mantiene una sesión con conexiones keep-alive (un pool por host), las
+    cabeceras base, un timeout por defecto y reintentos con backoff
+    exponencial ante errores 5xx y conexiones cortadas. Con una `cache`
+    (http_cache.ResponseCache), get_json puede servir respuestas públicas
+    desde disco y revalidarlas con ETag / If-Modified-Since.
+
+    Todas las peticiones pasan por un `scheduler` (request_scheduler), que
+    limita ritmo y concurrencia por host, atiende antes las de mayor
+    `priority` y reintenta los 429 tras su Retry-After.
+    """
+
+    def __init__(
+        self,
+        headers=None,
+        timeout=DEFAULT_TIMEOUT,
+        retries=DEFAULT_RETRIES,
+        backoff_factor=DEFAULT_BACKOFF,
+        pool_maxsize=DEFAULT_POOL_SIZE,
+        cache=None,
+        scheduler=None,
+    ):
+        self.timeout = timeout
+        self.cache = cache
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler()
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS,
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+            # Los 429 los gestiona el scheduler (pausa compartida por host), no urllib3
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _request(self, method, url, priority=PRIORIDAD_NORMAL, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        resp = self.scheduler.ejecutar(url, lambda: self.session.request(method, url, **kwargs), priority)
+        anotar(bytes=len(resp.content))
+        return resp
+
+    def get(self, url, **kwargs):
+        return self._request("GET", url, **kwargs)
+
+    def get_json(self, url, ttl=None, **kwargs):
+        """GET que devuelve el JSON parseado una sola vez.
+
+        Si hay caché y se indica `ttl` (segundos), la respuesta se sirve desde
+        la copia local mientras sea reciente y se revalida al caducar.
+        """
+        if self.cache is None or ttl is None:
+            resp = self.get(url, **kwargs)
+            resp.raise_for_status()
+            return resp.json()
+
+        entry = self.cache.get(url)
+        if self.cache.fresh(entry, ttl):
+            anotar(cache="hit")
+            return entry["body"]
+
+        headers = {**kwargs.pop("headers", {}), **self.cache.conditional_headers(entry)}
+        resp = self.get(url, headers=headers, **kwargs)
+        if resp.status_code == 304 and entry is not None:
+            anotar(cache="revalidated")
+            return self.cache.touch(url, entry)["body"]
+        resp.raise_for_status()
+        anotar(cache="miss")
+
+        body = resp.json()
+        self.cache.put(url, body, resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+        return body
+
+    def post(self, url, **kwargs):
+        return self._request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,76 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+COLORES_MANUAL = [
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"
+]
+
+
+def color_map_usuarios(df_usuarios: pd.DataFrame) -> dict:
+    """Color fijo por propietario_id (como string)."""
+    usuarios_ids = sorted(df_usuarios["id"].astype(int).astype(str).unique())
+    return {uid: COLORES_MANUAL[i % len(COLORES_MANUAL)] for i, uid in enumerate(usuarios_ids)}
+
+
+def _barras_por_propietario(df_jugadores, columna, etiqueta, titulo, decimales, color_map, desde_cero):
+    por_propietario = (
+        df_jugadores.groupby(["nombre_usuario", "propietario_id"])[columna]
+        .sum()
+        .reset_index()
+    )
+    por_propietario[etiqueta] = por_propietario[columna] / 1_000_000
+    por_propietario["propietario_id_str"] = por_propietario["propietario_id"].astype(int).astype(str)
+
+    # Orden descendente por el valor mostrado
+    por_propietario = por_propietario.sort_values(etiqueta, ascending=False)
+
+    # Forzar el orden de x según el valor
+    fig = px.bar(
+        por_propietario,
+        x="nombre_usuario",
+        y=etiqueta,
+        text=por_propietario[etiqueta].map(lambda x: f"{x:.{decimales}f}M"),
+        color="propietario_id_str",
+        color_discrete_map=color_map,
+        category_orders={"nombre_usuario": por_propietario["nombre_usuario"].tolist()},
+        labels={"nombre_usuario": "Propietario", etiqueta: titulo}
+    )
+    fig.update_traces(textposition="outside")
+    minimo = 0 if desde_cero else por_propietario[etiqueta].min() * 1.15
+    fig.update_layout(
+        margin=dict(t=100),
+        yaxis=dict(range=[minimo, por_propietario[etiqueta].max() * 1.15]),
+        showlegend=False,
+        dragmode=False
+    )
+    return fig
+
+
+# ==============================
+# FIGURAS POR SNAPSHOT
+# ==============================
+# Las figuras solo dependen del snapshot: se construyen una vez por id y se
+# comparten entre sesiones y reruns (los filtros de otras pestañas no las tocan).
+@st.cache_resource(max_entries=8, show_spinner=False)
+def figuras_propietarios(snapshot_id: str, _df_jugadores: pd.DataFrame, _df_usuarios: pd.DataFrame):
+    """Barras de valor total e incremento diario por propietario."""
+    color_map = color_map_usuarios(_df_usuarios)
+    fig_valor = _barras_por_propietario(
+        _df_jugadores, "valor_actual", "Valor (M)", "Valor total (millones)", 1, color_map, desde_cero=True
+    )
+    fig_incremento = _barras_por_propietario(
+        _df_jugadores, "variacion_diaria", "Incremento (M)", "Incremento diario (millones)", 2, color_map,
+        desde_cero=False,
+    )
+    return fig_valor, fig_incremento
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def figura_valor_posicion(snapshot_id: str, _df_jugadores: pd.DataFrame):
+    valor_pos = _df_jugadores.groupby("posicion", observed=True)["valor_actual"].mean().reset_index()
+    valor_pos["Valor (M)"] = valor_pos["valor_actual"]/1_000_000
+    fig_pos = px.bar(valor_pos, x="posicion", y="Valor (M)", text=valor_pos["Valor (M)"].map(lambda x: f"{x:.2f}M"))
+    fig_pos.update_traces(textposition="outside")
+    return fig_pos
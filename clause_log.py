@@ -0,0 +1,71 @@
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from data_loader import _clausulas_a_dataframe, iter_clausulas_ejecutadas
+from metrics import instrumentado
+
+# Una misma cláusula se identifica por fecha, jugador y usuarios implicados
+DEDUP_KEYS = ["entry_date", "player_id", "from_id", "to_id"]
+
+
+# ==============================
+# REGISTRO DE CLÁUSULAS
+# ==============================
+class ClauseLog:
+    """Registro persistente y sin duplicados de las cláusulas ejecutadas en la liga.
+
+    Cada actualización descarga solo las entradas del tablón posteriores a la
+    más reciente ya guardada, de modo que no se pierden entradas antiguas por
+    muy activa que sea la liga.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._df = self._load()
+
+    def _load(self) -> pd.DataFrame:
+        if self.path.exists():
+            df = pd.read_parquet(self.path)
+            # Registros antiguos guardados con fechas sin zona horaria (UTC)
+            if df["entry_date"].dt.tz is None:
+                df["entry_date"] = df["entry_date"].dt.tz_localize("UTC")
+            return df
+        # Registro vacío con los tipos del esquema (fechas incluidas), como si el tablón no tuviera entradas
+        return _clausulas_a_dataframe([])
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        self._df.to_parquet(tmp, index=False)
+        os.replace(tmp, self.path)
+
+    def newest_date(self):
+        """Fecha (epoch en segundos) de la entrada más reciente guardada, o None."""
+        if self._df.empty:
+            return None
+        return int(self._df["entry_date"].max().timestamp())
+
+    @instrumentado("clause_log.update")
+    def update(self, league_id, user_id, token, client=None) -> pd.DataFrame:
+        """Añade al registro las entradas nuevas del tablón y devuelve el registro completo."""
+        with self._lock:
+            since = self.newest_date()
+            paginas = list(iter_clausulas_ejecutadas(league_id, user_id, token, since=since, client=client))
+            if paginas:
+                nuevas = pd.concat(paginas, ignore_index=True)
+                frames = [df for df in (self._df, nuevas) if not df.empty]
+                self._df = (
+                    pd.concat(frames, ignore_index=True)
+                    .drop_duplicates(subset=DEDUP_KEYS, keep="last")
+                    .sort_values("entry_date", ascending=False, ignore_index=True)
+                )
+                self._save()
+            return self._df.copy()
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self._df.copy()
@@ -0,0 +1,213 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from metrics import instrumentado
+
+# Máximo de clausulazos que puede recibir un propietario por semana
+MAX_CLAUSULAZOS = 3
+# Ventana de la regla semanal (7 días, con 2 h de margen)
+VENTANA_CLAUSULAZOS = pd.Timedelta(days=7, hours=2)
+
+# Los costes se cuentan en unidades de UNIDAD € (redondeando hacia arriba)
+# salvo que compartan una unidad mayor; los estados (combinaciones de cuentas
+# por posición × unidades de presupuesto) no pasan de MAX_ESTADOS: con
+# presupuestos o límites por posición muy altos la unidad crece
+UNIDAD = 100_000
+MAX_ESTADOS = 250_000
+
+# Máximo de fichajes por posición que propone el optimizador por defecto, y el
+# máximo que se puede pedir
+LIMITES_POSICION = {"Portero": 1, "Defensa": 2, "Centrocampista": 2, "Delantero": 1}
+MAX_POR_POSICION = 3
+
+# Objetivos que se pueden maximizar
+OBJETIVOS = {
+    "Puntos": "puntos",
+    "Valor actual": "valor_actual",
+    "Plusvalía prevista": "plusvalia",
+}
+
+
+def clausulazos_por_propietario(df_clausulas: pd.DataFrame, ahora: pd.Timestamp) -> pd.Series:
+    """Clausulazos recibidos por cada propietario (from_id) en la última semana, hasta MAX_CLAUSULAZOS."""
+    recientes = df_clausulas[df_clausulas["entry_date"] >= ahora - VENTANA_CLAUSULAZOS]
+    return recientes.groupby("from_id").size().clip(upper=MAX_CLAUSULAZOS)
+
+
+# ==============================
+# CANDIDATOS
+# ==============================
+def candidatos(df: pd.DataFrame, user_id, valor_futuro: str = "valor_previsto") -> pd.DataFrame:
+    """Cláusulas pagables de otros propietarios, con la columna `plusvalia`.
+
+    `df` son los jugadores ya filtrados por fecha de desbloqueo (p. ej.
+    UnlockIndex.hasta_horas). La plusvalía es el valor previsto (o el actual
+    si no hay previsión) menos lo que cuesta la cláusula.
+    """
+    propios = df["propietario_id"].astype("Int64") == int(user_id)
+    df = df[df["valor_clausula"].notna() & df["propietario_id"].notna() & ~propios.fillna(False)]
+    futuro = df[valor_futuro] if valor_futuro in df else df["valor_actual"]
+    return df.assign(plusvalia=futuro - df["valor_clausula"])
+
+
+# ==============================
+# OPTIMIZADOR
+# ==============================
+@dataclass(frozen=True)
+class Seleccion:
+    jugadores: pd.DataFrame
+    coste: int
+    valor: float
+    # True si hubo que redondear costes: alguna combinación que apure más el presupuesto podría ser mejor
+    aproximada: bool = False
+
+
+def _no_dominadas(posicion, propietario, coste, valor, limites_pos, total) -> np.ndarray:
+    """Máscara de cláusulas que pueden estar en alguna selección óptima.
+
+    Una cláusula sobra si otras de su misma posición cuestan lo mismo o menos
+    y valen lo mismo o más, y hay suficientes para sustituirla siempre:
+    `limite` de ellas del mismo propietario (mismas cuentas por propietario)
+    o de al menos `total` propietarios distintos (alguno queda sin usar).
+    Se recorre cada posición por coste creciente guardando los mejores
+    valores vistos, por propietario y entre propietarios.
+    """
+    utiles = np.ones(len(coste), dtype=bool)
+    for eje, limite in enumerate(limites_pos):
+        filas = np.flatnonzero(posicion == eje)
+        orden = filas[np.lexsort((filas, -valor[filas], coste[filas]))]
+        por_dueno = {}  # propietario -> sus `limite` mejores valores (descendente)
+        mejores = {}  # los `total` propietarios con mejor valor -> ese valor
+        for i in orden:
+            v, dueno = valor[i], propietario[i]
+            propios = por_dueno.setdefault(dueno, [])
+            if (len(propios) >= limite and propios[limite - 1] >= v) or (
+                len(mejores) >= total and min(mejores.values()) >= v
+            ):
+                utiles[i] = False
+            propios.append(v)
+            propios.sort(reverse=True)
+            del propios[limite:]
+
+            # Los mejores valores solo crecen: quien sale de `mejores` solo vuelve
+            # con una cláusula mejor que la peor de las que quedan
+            if dueno in mejores or len(mejores) < total:
+                mejores[dueno] = max(mejores.get(dueno, v), v)
+            else:
+                peor = min(mejores, key=mejores.get)
+                if v > mejores[peor]:
+                    del mejores[peor]
+                    mejores[dueno] = v
+    return utiles
+
+
+def _indice(ndim: int, capas: slice, eje: int, cuentas: slice, presupuesto: slice) -> tuple:
+    """Índice sobre (capa, cuenta_pos_0, ..., cuenta_pos_n, presupuesto) que corta capa, `eje` y presupuesto."""
+    idx = [slice(None)] * ndim
+    idx[0] = capas
+    idx[eje] = cuentas
+    idx[-1] = presupuesto
+    return tuple(idx)
+
+
+@instrumentado("clause_optimizer.optimizar")
+def optimizar(candidatos: pd.DataFrame, presupuesto: int, objetivo: str, max_por_posicion: dict,
+              recibidos: pd.Series = None, unidad: int = UNIDAD) -> Seleccion:
+    """Mejor combinación de cláusulas para `objetivo` sin pasar de `presupuesto`.
+
+    Mochila 0/1 resuelta con programación dinámica vectorizada: el estado es
+    (jugadores elegidos por posición, presupuesto gastado) y cada cláusula se
+    aplica a todos los estados a la vez. Antes se descartan las cláusulas
+    dominadas (ver _no_dominadas). Los costes se cuentan en múltiplos de
+    `unidad` € (o de la unidad común de todos si es mayor), más grande si el
+    estado pasaría de MAX_ESTADOS; si hay que redondear, cada coste se
+    redondea hacia arriba, así que toda selección devuelta cabe en el
+    presupuesto real, y la selección se marca como `aproximada`.
+    La regla de MAX_CLAUSULAZOS por semana se respeta procesando las
+    cláusulas de cada propietario por capas (cuántas se le han quitado ya),
+    con tantas capas como clausulazos le quedan según `recibidos`
+    (from_id -> recibidos).
+    """
+    recibidos = recibidos if recibidos is not None else pd.Series(dtype="int64")
+    posiciones = [p for p, limite in max_por_posicion.items() if limite > 0]
+    valor = pd.to_numeric(candidatos[objetivo], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    coste = candidatos["valor_clausula"].to_numpy(dtype="float64", na_value=np.nan)
+    restantes = MAX_CLAUSULAZOS - candidatos["propietario_id"].map(recibidos).fillna(0).to_numpy(dtype="int64")
+
+    # Solo cuentan las cláusulas que suman, caben y no chocan con ningún límite
+    utiles = (
+        (valor > 0) & (coste <= presupuesto) & (restantes > 0)
+        & candidatos["posicion"].isin(posiciones).to_numpy(dtype=bool)
+    )
+    df = candidatos[utiles]
+    if df.empty or presupuesto <= 0:
+        return Seleccion(candidatos.iloc[:0], 0, 0.0)
+    valor, coste, restantes = valor[utiles], coste[utiles], restantes[utiles]
+
+    eje_posicion = df["posicion"].map({p: i for i, p in enumerate(posiciones)}).to_numpy(dtype="int64")
+    limites = [min(max_por_posicion[p], int((eje_posicion == i).sum())) for i, p in enumerate(posiciones)]
+    total = sum(limites)
+
+    propietarios = df["propietario_id"].to_numpy(dtype="int64")
+    utiles = _no_dominadas(eje_posicion, propietarios, coste, valor, np.array(limites), total)
+    df, valor, coste, restantes = df[utiles], valor[utiles], coste[utiles], restantes[utiles]
+    eje_posicion, propietarios = eje_posicion[utiles], propietarios[utiles]
+
+    # Con la unidad común de todos los costes no hay que redondear nada
+    comun = int(np.gcd.reduce(coste.astype("int64")))
+    unidad = max(unidad, comun)
+    combinaciones = int(np.prod([limite + 1 for limite in limites]))
+    unidad = max(unidad, -(-int(presupuesto) * combinaciones // MAX_ESTADOS))
+    resolucion = int(presupuesto // unidad)
+    celdas = -(-coste.astype("int64") // unidad)
+    aproximada = bool((coste % unidad).any())
+
+    forma = tuple(limite + 1 for limite in limites) + (resolucion + 1,)
+    dp = np.full(forma, -np.inf)
+    dp[(0,) * len(limites)] = 0.0
+    ndim = len(forma) + 1  # con el eje de capa delante
+
+    grupos = []
+    for propietario in pd.unique(propietarios):
+        filas = np.flatnonzero(propietarios == propietario)
+        capas_max = int(min(restantes[filas[0]], len(filas), total))
+        capas = np.full((capas_max + 1,) + forma, -np.inf)
+        capas[0] = dp
+        mascaras = []
+        for i in filas:
+            eje, c = eje_posicion[i] + 1, celdas[i]
+            limite = limites[eje - 1]
+            origen = capas[_indice(ndim, slice(0, capas_max), eje, slice(0, limite), slice(0, resolucion + 1 - c))]
+            destino = capas[_indice(ndim, slice(1, capas_max + 1), eje, slice(1, limite + 1), slice(c, None))]
+            candidato = origen + valor[i]
+            mejor = candidato > destino
+            np.copyto(destino, candidato, where=mejor)
+            mascaras.append(mejor)
+        # La capa de cada estado solo hace falta en la reconstrucción
+        grupos.append((filas, mascaras, capas.argmax(axis=0).astype("int8")))
+        dp = capas.max(axis=0)
+
+    # Reconstrucción: desde el mejor estado con todo el presupuesto, deshaciendo grupos y cláusulas
+    final = dp[..., resolucion]
+    estado = list(np.unravel_index(np.argmax(final), final.shape)) + [resolucion]
+    if not np.isfinite(final[tuple(estado[:-1])]):
+        return Seleccion(candidatos.iloc[:0], 0, 0.0)
+
+    elegidas = []
+    for filas, mascaras, capas in reversed(grupos):
+        capa = int(capas[tuple(estado)])
+        for i, mejor in zip(reversed(filas), reversed(mascaras)):
+            eje, c = eje_posicion[i], celdas[i]
+            if capa == 0 or estado[eje] == 0 or estado[-1] < c:
+                continue
+            previo = list(estado)
+            previo[eje] -= 1
+            previo[-1] -= c
+            if mejor[(capa - 1, *previo)]:
+                elegidas.append(i)
+                estado, capa = previo, capa - 1
+
+    seleccion = df.iloc[sorted(elegidas)]
+    return Seleccion(seleccion, int(coste[elegidas].sum()), float(valor[elegidas].sum()), aproximada)
@@ -1,13 +1,25 @@
-import requests
+import os
 import pandas as pd
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from biwenger_client import BiwengerClient
+from request_scheduler import PRIORIDAD_ALTA, PRIORIDAD_BAJA, PRIORIDAD_NORMAL
+from metrics import instrumentado
 
 EMAIL = None
 PASSWORD = None
 LEAGUE_ID = None
 USER_ID = None
 
-LOGIN_URL = "https://biwenger.as.com/api/v2/auth/login"
+# URLs base de la API; se pueden apuntar a un servidor local (fake_biwenger.py)
+API_URL = os.environ.get("BIWENGER_API_URL", "https://biwenger.as.com/api/v2")
+CF_API_URL = os.environ.get("BIWENGER_CF_API_URL", "https://cf.biwenger.com/api/v2")
+
+# Número máximo de peticiones simultáneas al descargar plantillas
+MAX_WORKERS = 8
+
+# Segundos que se reutiliza sin revalidar el JSON público de la competición
+PUBLIC_PLAYERS_TTL = 600
 
 # ==============================
 # HEADERS BASE
@@ -24,164 +36,254 @@ HEADERS_BASE = {
     "Origin": "https://biwenger.as.com",
 }
 
+# ==============================
+# CLIENTE HTTP COMPARTIDO
+# ==============================
+_default_client = None
+
+
+def get_default_client() -> BiwengerClient:
+    """Cliente compartido con HEADERS_BASE, usado cuando no se pasa uno explícito."""
+    global _default_client
+    if _default_client is None:
+        _default_client = BiwengerClient(headers=HEADERS_BASE)
+    return _default_client
+
+# ==============================
+# ESQUEMAS DE LOS DATAFRAMES
+# ==============================
+POSITION_MAP = {1: "Portero", 2: "Defensa", 3: "Centrocampista", 4: "Delantero"}
+POSICIONES = pd.CategoricalDtype(list(POSITION_MAP.values()), ordered=True)
+
+# Columnas "fecha" reciben epochs en segundos y se convierten a datetime UTC
+FECHA = "datetime64[ns, UTC]"
+
+SCHEMA_LIGA = {
+    "id": "Int32", "nombre": "string", "tipo": "string", "modo": "string", "competicion": "string",
+    "icono": "string", "portada": "string", "creada": FECHA, "descripcion": "string",
+}
+SCHEMA_USUARIOS = {
+    "id": "Int32", "nombre": "string", "imagen": "string", "puntos": "Int32",
+    "valor_equipo": "Int64", "variacion_valor": "Int64", "tamano_equipo": "Int16",
+    "rol": "string", "posicion": "Int16",
+}
+SCHEMA_EQUIPOS = {"teamID": "Int32", "equipo": "category", "slug_equipo": "string"}
+SCHEMA_PUBLICOS = {
+    "id": "Int32", "slug": "string", "nombre": "string", "teamID": "Int32", "posicion": POSICIONES,
+    "puntos": "Int32", "valor_actual": "Int64", "variacion_diaria": "Int64", "enlace_imagen": "string",
+}
+SCHEMA_PROPIOS = {
+    "id": "Int32", "propietario_id": "Int32", "valor_clausula": "Int64", "fecha_desbloqueo": FECHA,
+    "precio_compra": "Int64", "fecha_compra": FECHA, "loan_to": "string", "loan_duration": "Int16",
+}
+SCHEMA_CLAUSULAS = {
+    "player_id": "Int32", "from_id": "Int32", "from_name": "string", "to_id": "Int32",
+    "to_name": "string", "to_icon": "string", "amount": "Int64", "clause_type": "string",
+    "entry_type": "string", "entry_title": "string", "entry_date": FECHA, "entry_fixed": "object",
+    "entry_author": "object",
+}
+
+
+def _frame(columnas: dict, schema: dict) -> pd.DataFrame:
+    """Construye un DataFrame columna a columna aplicando el esquema indicado."""
+    data = {}
+    for col, dtype in schema.items():
+        valores = columnas[col]
+        if dtype == FECHA:
+            epochs = pd.Series([v or None for v in valores], dtype="Float64")
+            data[col] = pd.to_datetime(epochs, unit="s", utc=True).astype(FECHA)
+        else:
+            data[col] = pd.Series(valores, dtype=dtype)
+    return pd.DataFrame(data)
+
+
 # ==============================
 # FUNCIONES
 # ==============================
-def get_biwenger_token(email: str, password: str):
+@instrumentado("data_loader.get_biwenger_token")
+def get_biwenger_token(email: str, password: str, client=None):
+    client = client or get_default_client()
     user = {"email": email, "password": password}
     headers = {"Content-Type": "application/json"}
-    response = requests.post(LOGIN_URL, headers=headers, json=user)
+    response = client.post(f"{API_URL}/auth/login", headers=headers, json=user, priority=PRIORIDAD_ALTA)
     if response.status_code == 200:
         token_data = response.json()
         return token_data.get("token")
     return None
 
 
-def get_league_data(league_id, token, user_id):
-    url = f"https://biwenger.as.com/api/v2/league?include=all,-lastAccess&fields=*,standings,tournaments,group,settings(description)"
-    headers = {**HEADERS_BASE, "Authorization": f"Bearer {token}", "X-League": league_id, "X-User": user_id}
-    resp = requests.get(url, headers=headers)
+@instrumentado("data_loader.get_league_data")
+def get_league_data(league_id, token, user_id, client=None):
+    client = client or get_default_client()
+    url = f"{API_URL}/league?include=all,-lastAccess&fields=*,standings,tournaments,group,settings(description)"
+    headers = {"Authorization": f"Bearer {token}", "X-League": str(league_id), "X-User": str(user_id)}
+    resp = client.get(url, headers=headers, priority=PRIORIDAD_ALTA)
     resp.raise_for_status()
     data = resp.json()["data"]
 
     # Liga
-    df_liga = pd.DataFrame([{
-        "id": data.get("id"),
-        "nombre": data.get("name"),
-        "tipo": data.get("type"),
-        "modo": data.get("mode"),
-        "competicion": data.get("competition"),
-        "icono": f"https://cdn.biwenger.com/{data.get('icon')}" if data.get("icon") else None,
-        "portada": f"https://cdn.biwenger.com/{data.get('cover')}" if data.get("cover") else None,
-        "creada": datetime.fromtimestamp(data["created"]) if data.get("created") else None,
-        "descripcion": data.get("settings", {}).get("description", "")
-    }])
+    df_liga = _frame({
+        "id": [data.get("id")],
+        "nombre": [data.get("name")],
+        "tipo": [data.get("type")],
+        "modo": [data.get("mode")],
+        "competicion": [data.get("competition")],
+        "icono": [f"https://cdn.biwenger.com/{data.get('icon')}" if data.get("icon") else None],
+        "portada": [f"https://cdn.biwenger.com/{data.get('cover')}" if data.get("cover") else None],
+        "creada": [data.get("created")],
+        "descripcion": [data.get("settings", {}).get("description", "")],
+    }, SCHEMA_LIGA)
 
     # Usuarios
     standings = data.get("standings", [])
-    df_users = pd.DataFrame([{
-        "id": u.get("id"),
-        "nombre": u.get("name"),
-        "imagen": (
-            u.get("icon") if u.get("icon", "").startswith("http")
-            else (f"https://cdn.biwenger.com/{u.get('icon')}" if u.get("icon") else "https://cdn.biwenger.com/img/user.svg")
-        ),
-        "puntos": u.get("points"),
-        "valor_equipo": u.get("teamValue"),
-        "variacion_valor": u.get("teamValueInc"),
-        "tamano_equipo": u.get("teamSize"),
-        "rol": u.get("role"),
-        "posicion": u.get("position")
-    } for u in standings])
+    iconos = [u.get("icon") or "" for u in standings]
+    df_users = _frame({
+        "id": [u.get("id") for u in standings],
+        "nombre": [u.get("name") for u in standings],
+        "imagen": [
+            icono if icono.startswith("http")
+            else (f"https://cdn.biwenger.com/{icono}" if icono else "https://cdn.biwenger.com/img/user.svg")
+            for icono in iconos
+        ],
+        "puntos": [u.get("points") for u in standings],
+        "valor_equipo": [u.get("teamValue") for u in standings],
+        "variacion_valor": [u.get("teamValueInc") for u in standings],
+        "tamano_equipo": [u.get("teamSize") for u in standings],
+        "rol": [u.get("role") for u in standings],
+        "posicion": [u.get("position") for u in standings],
+    }, SCHEMA_USUARIOS)
 
     return df_liga, df_users
 
 
-def get_public_players():
-    url = "https://cf.biwenger.com/api/v2/competitions/la-liga/data?lang=es&score=2"
-    resp = requests.get(url, headers=HEADERS_BASE)
-    resp.raise_for_status()
-    players = resp.json()["data"]["players"]
-
-    position_map = {1: "Portero", 2: "Defensa", 3: "Centrocampista", 4: "Delantero"}
-    teams_data = resp.json()["data"]["teams"]
-
-    df_teams = pd.DataFrame([{
-        "teamID": int(team["id"]),
-        "equipo": team["name"],
-        "slug_equipo": team["slug"]
-    } for team in teams_data.values()])
-
-    df_players_public = pd.DataFrame([{
-        "id": p.get("id"),
-        "slug": p.get("slug"),
-        "nombre": p.get("name"),
-        "teamID": p.get("teamID"),
-        "posicion": position_map.get(p.get("position")),
-        "puntos": p.get("points"),
-        "valor_actual": p.get("price"),
-        "variacion_diaria": p.get("priceIncrement"),
-        "enlace_imagen": f"https://cdn.biwenger.com/cdn-cgi/image/f=avif/i/p/{p.get('id')}.png"
-    } for p in players.values()])
-
-    df_players_public["teamID"] = df_players_public["teamID"].astype("Int64")
-    df_teams["teamID"] = df_teams["teamID"].astype("Int64")
+@instrumentado("data_loader.get_public_players")
+def get_public_players(client=None):
+    client = client or get_default_client()
+    url = f"{CF_API_URL}/competitions/la-liga/data?lang=es&score=2"
+    data = client.get_json(url, ttl=PUBLIC_PLAYERS_TTL, priority=PRIORIDAD_NORMAL)["data"]
+    players = list(data["players"].values())
+    teams = list(data["teams"].values())
+
+    df_teams = _frame({
+        "teamID": [int(team["id"]) for team in teams],
+        "equipo": [team["name"] for team in teams],
+        "slug_equipo": [team["slug"] for team in teams],
+    }, SCHEMA_EQUIPOS)
+
+    ids = [p.get("id") for p in players]
+    df_players_public = _frame({
+        "id": ids,
+        "slug": [p.get("slug") for p in players],
+        "nombre": [p.get("name") for p in players],
+        "teamID": [p.get("teamID") for p in players],
+        "posicion": [POSITION_MAP.get(p.get("position")) for p in players],
+        "puntos": [p.get("points") for p in players],
+        "valor_actual": [p.get("price") for p in players],
+        "variacion_diaria": [p.get("priceIncrement") for p in players],
+        "enlace_imagen": [f"https://cdn.biwenger.com/cdn-cgi/image/f=avif/i/p/{i}.png" for i in ids],
+    }, SCHEMA_PUBLICOS)
 
     return df_players_public.merge(df_teams, on="teamID", how="inner")
 
 
-def get_user_players(x_user, user_id, league_id, token):
-    url = f"https://biwenger.as.com/api/v2/user/{user_id}?fields=players(*,fitness,team,owner)"
-    headers = {**HEADERS_BASE, "Authorization": f"Bearer {token}", "X-League": league_id, "X-User": x_user}
-    resp = requests.get(url, headers=headers)
+@instrumentado("data_loader.get_user_players")
+def get_user_players(x_user, user_id, league_id, token, client=None):
+    client = client or get_default_client()
+    url = f"{API_URL}/user/{user_id}?fields=players(*,fitness,team,owner)"
+    headers = {"Authorization": f"Bearer {token}", "X-League": str(league_id), "X-User": str(x_user)}
+    resp = client.get(url, headers=headers, priority=PRIORIDAD_BAJA)
     resp.raise_for_status()
     data = resp.json()["data"]
 
-    players = data.get("players", [])
-
-    df_players_owned = pd.DataFrame([
-        {
-            "id": p.get("id"),
-            "propietario_id": user_id,
-            "valor_clausula": int((p.get("owner") or {}).get("clause") or 0),
-            "fecha_desbloqueo": (
-                datetime.fromtimestamp((p.get("owner") or {}).get("clauseLockedUntil"))
-                if (p.get("owner") or {}).get("clauseLockedUntil") else None
-            ),
-            "precio_compra": int((p.get("owner") or {}).get("price") or 0),
-            "fecha_compra": (
-                datetime.fromtimestamp((p.get("owner") or {}).get("date"))
-                if (p.get("owner") or {}).get("date") else None
-            ),
-            "loan_to": (
-                (p.get("owner") or {}).get("loan", {}).get("user", {}).get("name")
-                if (p.get("owner") or {}).get("loan") else None
-            ),
-            "loan_duration": (
-                (p.get("owner") or {}).get("loan", {}).get("rounds")
-                if (p.get("owner") or {}).get("loan") else None
-            )
-        }
-        for p in players
-        if not ((p.get("owner") or {}).get("loan") and (p["owner"]["loan"].get("type") == "in"))
-    ])
+    # Se descartan los jugadores cedidos a este usuario (loan "in")
+    players = [
+        (p.get("id"), p.get("owner") or {})
+        for p in data.get("players", [])
+    ]
+    players = [(pid, owner) for pid, owner in players if not (owner.get("loan") and owner["loan"].get("type") == "in")]
+    owners = [owner for _, owner in players]
+    loans = [owner.get("loan") or {} for owner in owners]
+
+    df_players_owned = _frame({
+        "id": [pid for pid, _ in players],
+        "propietario_id": [int(user_id)] * len(players),
+        "valor_clausula": [owner.get("clause") or 0 for owner in owners],
+        "fecha_desbloqueo": [owner.get("clauseLockedUntil") for owner in owners],
+        "precio_compra": [owner.get("price") or 0 for owner in owners],
+        "fecha_compra": [owner.get("date") for owner in owners],
+        "loan_to": [loan.get("user", {}).get("name") if loan else None for loan in loans],
+        "loan_duration": [loan.get("rounds") if loan else None for loan in loans],
+    }, SCHEMA_PROPIOS)
 
     return df_players_owned
 
 
-def obtener_clausulas_ejecutadas(league_id, user_id, token, limit=8) -> pd.DataFrame:
-    url = f"https://biwenger.as.com/api/v2/league/{league_id}/board?type=clauses&limit={limit}"
-    headers = {**HEADERS_BASE, "Authorization": f"Bearer {token}", "X-League": league_id, "X-User": user_id}
-    resp = requests.get(url, headers=headers)
+@instrumentado("data_loader.get_all_user_players")
+def get_all_user_players(x_user, user_ids, league_id, token, max_workers=MAX_WORKERS, client=None) -> pd.DataFrame:
+    """Descarga en paralelo las plantillas de todos los usuarios y las une en un solo DataFrame."""
+    client = client or get_default_client()
+    user_ids = list(user_ids)
+    if not user_ids:
+        return pd.DataFrame()
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(user_ids))) as pool:
+        frames = list(pool.map(
+            lambda uid: get_user_players(x_user, uid, league_id, token, client=client),
+            user_ids
+        ))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+CLAUSE_COLUMNS = list(SCHEMA_CLAUSULAS)
+
+
+def _clausulas_a_dataframe(entries) -> pd.DataFrame:
+    # Una fila por cada contenido de cada entrada del tablón
+    filas = [(entry, content) for entry in entries for content in entry.get("content", [])]
+    origen = [content.get("from", {}) for _, content in filas]
+    destino = [content.get("to", {}) for _, content in filas]
+
+    return _frame({
+        "player_id": [content.get("player") for _, content in filas],
+        "from_id": [f.get("id") for f in origen],
+        "from_name": [f.get("name") for f in origen],
+        "to_id": [t.get("id") for t in destino],
+        "to_name": [t.get("name") for t in destino],
+        "to_icon": [t.get("icon") for t in destino],
+        "amount": [content.get("amount") for _, content in filas],
+        "clause_type": [content.get("type") for _, content in filas],
+        "entry_type": [entry.get("type") for entry, _ in filas],
+        "entry_title": [entry.get("title") for entry, _ in filas],
+        "entry_date": [entry.get("date") for entry, _ in filas],
+        "entry_fixed": [entry.get("fixed") for entry, _ in filas],
+        "entry_author": [entry.get("author") for entry, _ in filas],
+    }, SCHEMA_CLAUSULAS)
+
+
+@instrumentado("data_loader.board_page")
+def _get_board_page(league_id, user_id, token, offset, limit, client):
+    url = f"{API_URL}/league/{league_id}/board?type=clauses&offset={offset}&limit={limit}"
+    headers = {"Authorization": f"Bearer {token}", "X-League": str(league_id), "X-User": str(user_id)}
+    resp = client.get(url, headers=headers, priority=PRIORIDAD_ALTA)
     resp.raise_for_status()
-    data = resp.json()["data"]
+    return resp.json()["data"] or []
+
+
+def iter_clausulas_ejecutadas(league_id, user_id, token, since=None, page_size=50, max_pages=200, client=None):
+    """Recorre el tablón de cláusulas página a página, de más reciente a más antigua.
 
-    registros = []
-    for entry in data:
-        for content in entry.get("content", []):
-            registros.append({
-                "player_id": content.get("player"),
-                "from_id": content.get("from", {}).get("id"),
-                "from_name": content.get("from", {}).get("name"),
-                "to_id": content.get("to", {}).get("id"),
-                "to_name": content.get("to", {}).get("name"),
-                "to_icon": content.get("to", {}).get("icon"),
-                "amount": content.get("amount"),
-                "clause_type": content.get("type"),
-                "entry_type": entry.get("type"),
-                "entry_title": entry.get("title"),
-                "entry_date": entry.get("date"),
-                "entry_fixed": entry.get("fixed"),
-                "entry_author": entry.get("author")
-            })
-
-    df_clausulas = pd.DataFrame(registros)
-
-    int_columns = ["player_id", "from_id", "to_id", "amount"]
-    for col in int_columns:
-        if col in df_clausulas:
-            df_clausulas[col] = pd.to_numeric(df_clausulas[col], errors="coerce").astype("Int64")
-
-    df_clausulas["entry_date"] = pd.to_datetime(df_clausulas["entry_date"], unit="s")
-
-    return df_clausulas
+    Devuelve un DataFrame por página y se detiene al llegar a entradas con fecha
+    anterior a `since` (epoch en segundos), o cuando no quedan más páginas.
+    """
+    client = client or get_default_client()
+    for page in range(max_pages):
+        data = _get_board_page(league_id, user_id, token, page * page_size, page_size, client)
+        if since is not None:
+            nuevas = [e for e in data if (e.get("date") or 0) >= since]
+        else:
+            nuevas = data
+        if nuevas:
+            yield _clausulas_a_dataframe(nuevas)
+        if len(data) < page_size or len(nuevas) < len(data):
+            return
@@ -0,0 +1,300 @@
+"""Servidor local que imita los endpoints de Biwenger que usa data_loader.
+
+Sirve fixtures JSON grabados o una liga sintética de tamaño configurable, y
+puede añadir latencia, errores 5xx y respuestas 429 para medir y probar el
+refresco sin credenciales ni red.
+
+Uso:
+    python fake_biwenger.py --managers 20 --players 600 --latency 80
+    BIWENGER_API_URL=http://127.0.0.1:8765/api/v2 \\
+    BIWENGER_CF_API_URL=http://127.0.0.1:8765/api/v2 streamlit run streamlit_app.py
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# Fecha de referencia de los datos sintéticos (epoch en segundos)
+BASE_EPOCH = 1760000000
+
+
+# ==============================
+# LIGA SINTÉTICA
+# ==============================
+def generar_liga(managers=20, players=600, board=50, league_id=1, seed=0, now=None) -> dict:
+    """Payloads con la misma forma que la API: league, users, board, competition y login."""
+    rng = random.Random(seed)
+    now = int(now or time.time())
+
+    teams = {str(t): {"id": t, "name": f"Equipo {t}", "slug": f"equipo-{t}"} for t in range(1, 21)}
+    jugadores = {
+        str(pid): {
+            "id": pid,
+            "slug": f"jugador-{pid}",
+            "name": f"Jugador {pid}",
+            "teamID": rng.randint(1, 20),
+            "position": rng.randint(1, 4),
+            "points": rng.randint(0, 200),
+            "price": rng.randint(150_000, 60_000_000),
+            "priceIncrement": rng.randint(-1_000_000, 1_000_000),
+        }
+        for pid in range(1, players + 1)
+    }
+
+    user_ids = [1000 + i for i in range(managers)]
+    standings = [
+        {
+            "id": uid,
+            "name": f"Manager {uid}",
+            "icon": "" if i % 3 == 0 else f"icons/{uid}.png",
+            "points": rng.randint(0, 2000),
+            "teamValue": rng.randint(50_000_000, 400_000_000),
+            "teamValueInc": rng.randint(-5_000_000, 5_000_000),
+            "teamSize": 0,
+            "role": "admin" if i == 0 else "user",
+            "position": i + 1,
+        }
+        for i, uid in enumerate(user_ids)
+    ]
+
+    # Plantillas: se reparten jugadores sin repetir (hasta 15 por manager)
+    libres = list(jugadores)
+    rng.shuffle(libres)
+    squads = {}
+    for u in standings:
+        propios = [libres.pop() for _ in range(min(15, len(libres)))]
+        u["teamSize"] = len(propios)
+        squads[u["id"]] = {"data": {"id": u["id"], "name": u["name"], "players": [
+            {
+                "id": int(pid),
+                "owner": {
+                    "clause": rng.randint(1_000_000, 90_000_000),
+                    "clauseLockedUntil": now + rng.randint(-72, 72) * 3600,
+                    "price": rng.randint(150_000, 60_000_000),
+                    "date": now - rng.randint(1, 200) * 86400,
+                    "loan": None,
+                },
+            }
+            for pid in propios
+        ]}}
+
+    entries = []
+    for i in range(board):
+        origen, destino = rng.sample(standings, 2) if len(standings) > 1 else (standings[0], standings[0])
+        entries.append({
+            "type": "clause",
+            "title": "Clausulazo",
+            "date": now - i * 3600,
+            "fixed": False,
+            "author": None,
+            "content": [{
+                "player": rng.randint(1, players),
+                "from": {"id": origen["id"], "name": origen["name"]},
+                "to": {"id": destino["id"], "name": destino["name"], "icon": destino["icon"]},
+                "amount": rng.randint(1_000_000, 90_000_000),
+                "type": "clause",
+            }],
+        })
+
+    league = {"data": {
+        "id": league_id, "name": "Liga de pruebas", "type": "classic", "mode": "points",
+        "competition": "la-liga", "icon": "icons/league.png", "cover": None, "created": BASE_EPOCH,
+        "settings": {"description": "Liga sintética"}, "standings": standings,
+    }}
+
+    return {
+        "league": league,
+        "users": squads,
+        "board": entries,
+        "competition": {"data": {"players": jugadores, "teams": teams}},
+    }
+
+
+def cargar_fixtures(path) -> dict:
+    """Lee fixtures grabados: league.json, competition.json, board.json y users/<id>.json."""
+    path = Path(path)
+    leer = lambda f: json.loads((path / f).read_text(encoding="utf-8"))
+    return {
+        "league": leer("league.json"),
+        "competition": leer("competition.json"),
+        "board": leer("board.json")["data"],
+        "users": {int(f.stem): leer(f"users/{f.name}") for f in (path / "users").glob("*.json")},
+    }
+
+
+def guardar_fixtures(payloads: dict, path):
+    path = Path(path)
+    (path / "users").mkdir(parents=True, exist_ok=True)
+    escribir = lambda f, data: (path / f).write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+    escribir("league.json", payloads["league"])
+    escribir("competition.json", payloads["competition"])
+    escribir("board.json", {"data": payloads["board"]})
+    for uid, squad in payloads["users"].items():
+        escribir(f"users/{uid}.json", squad)
+
+
+def _token_falso(ttl=12 * 3600) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": int(time.time()) + ttl}).encode()).decode().rstrip("=")
+    return f"fake.{payload}.firma"
+
+
+# ==============================
+# SERVIDOR
+# ==============================
+class FakeBiwenger:
+    """Servidor HTTP en un hilo propio; `base_url` sirve como API_URL y CF_API_URL."""
+
+    def __init__(self, payloads: dict, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=1, seed=0):
+        self.payloads = payloads
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        competition = json.dumps(payloads["competition"]).encode()
+        self._competition = (competition, f'"{hashlib.sha1(competition).hexdigest()}"')
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v2"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _fallo(self):
+        """Código de error a inyectar en esta petición, o None."""
+        with self._lock:
+            self.requests += 1
+            r = self._rng.random()
+            espera = max(self.latency + self._rng.uniform(-self.jitter, self.jitter), 0)
+        if espera:
+            time.sleep(espera / 1000)
+        if r < self.rate_limit_rate:
+            return 429
+        if r < self.rate_limit_rate + self.error_rate:
+            return 503
+        return None
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status, data=None, headers=None, raw=None):
+                body = raw if raw is not None else (json.dumps(data).encode() if data is not None else b"")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _error(self, status):
+                headers = {"Retry-After": str(fake.retry_after)} if status == 429 else None
+                self._json(status, {"status": status}, headers)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if (status := fake._fallo()) is not None:
+                    return self._error(status)
+                if urlparse(self.path).path.endswith("/auth/login"):
+                    return self._json(200, {"token": _token_falso()})
+                self._json(404, {"status": 404})
+
+            def do_GET(self):
+                if (status := fake._fallo()) is not None:
+                    return self._error(status)
+                url = urlparse(self.path)
+                ruta, query = url.path, parse_qs(url.query)
+
+                if ruta.endswith("/competitions/la-liga/data"):
+                    body, etag = fake._competition
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._json(304, raw=b"", headers={"ETag": etag})
+                    return self._json(200, raw=body, headers={"ETag": etag})
+
+                if ruta.endswith("/league"):
+                    return self._json(200, fake.payloads["league"])
+
+                if re.search(r"/league/\d+/board$", ruta):
+                    offset = int(query.get("offset", ["0"])[0])
+                    limit = int(query.get("limit", ["50"])[0])
+                    return self._json(200, {"data": fake.payloads["board"][offset:offset + limit]})
+
+                if m := re.search(r"/user/(\d+)$", ruta):
+                    squad = fake.payloads["users"].get(int(m.group(1)))
+                    return self._json(200, squad) if squad else self._json(404, {"status": 404})
+
+                self._json(404, {"status": 404})
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local que imita la API de Biwenger")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="carpeta con fixtures grabados (si no, liga sintética)")
+    parser.add_argument("--dump-fixtures", help="guardar la liga sintética como fixtures y terminar")
+    parser.add_argument("--managers", type=int, default=20)
+    parser.add_argument("--players", type=int, default=600)
+    parser.add_argument("--board", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="latencia media por petición (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="variación de la latencia (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probabilidad de responder 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="probabilidad de responder 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="segundos de Retry-After en los 429")
+    args = parser.parse_args(argv)
+
+    if args.fixtures:
+        payloads = cargar_fixtures(args.fixtures)
+    else:
+        payloads = generar_liga(args.managers, args.players, args.board, seed=args.seed)
+
+    if args.dump_fixtures:
+        guardar_fixtures(payloads, args.dump_fixtures)
+        return
+
+    fake = FakeBiwenger(
+        payloads, args.host, args.port, args.latency, args.jitter,
+        args.error_rate, args.rate_limit_rate, args.retry_after, args.seed,
+    )
+    print(f"Fake Biwenger en {fake.base_url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        fake.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
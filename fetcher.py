@@ -0,0 +1,140 @@
+"""Descarga en segundo plano de los datos de Biwenger.
+
+Sigue el mismo horario de refresco que la app y publica cada descarga como
+snapshot actual en el histórico, de modo que la app solo tenga que leerlo.
+
+Uso:
+    python fetcher.py            # daemon: descarga en cada hora de refresco
+    python fetcher.py --once     # descarga el tramo actual si falta y termina
+"""
+import argparse
+import logging
+import os
+import time
+import tomllib
+from datetime import datetime
+
+from biwenger_client import BiwengerClient
+from clause_log import ClauseLog
+from data_loader import HEADERS_BASE
+from http_cache import ResponseCache
+from leagues import ligas_desde_config, ruta_liga
+import metrics
+from pipeline import PublicPlayers, refrescar
+from refresh_schedule import TZ, last_refresh, next_refresh
+from snapshots import SnapshotHistory, SnapshotStore
+from token_manager import TokenManager
+
+log = logging.getLogger("fetcher")
+
+# Claves de configuración (mismos nombres que en .streamlit/secrets.toml)
+DEFAULTS = {
+    "TOKEN_CACHE_PATH": None,
+    "HISTORY_DIR": "data/historico",
+    "CLAUSE_LOG_PATH": "data/clausulas.parquet",
+    "HTTP_CACHE_DIR": "data/http_cache",
+}
+REQUIRED = ("EMAIL", "PASSWORD")
+# Con una tabla [LEAGUES.<clave>] en secrets.toml estas dos no hacen falta
+LIGA_UNICA = ("LEAGUE_ID", "USER_ID")
+
+# Segundos de espera tras una descarga fallida
+RETRY_DELAY = 60
+
+
+def cargar_config(secrets_path: str) -> dict:
+    """Lee secrets.toml (si existe); las variables de entorno tienen prioridad."""
+    config = dict(DEFAULTS)
+    if os.path.exists(secrets_path):
+        with open(secrets_path, "rb") as f:
+            config.update(tomllib.load(f))
+    for clave in (*REQUIRED, *LIGA_UNICA, *DEFAULTS):
+        if clave in os.environ:
+            config[clave] = os.environ[clave]
+    requeridas = REQUIRED if config.get("LEAGUES") else (*REQUIRED, *LIGA_UNICA)
+    faltan = [clave for clave in requeridas if not config.get(clave)]
+    if faltan:
+        raise SystemExit(f"Faltan claves de configuración: {', '.join(faltan)}")
+    return config
+
+
+class Fetcher:
+    def __init__(self, config: dict):
+        self.ligas = ligas_desde_config(config)
+        self.client = BiwengerClient(headers=HEADERS_BASE, cache=ResponseCache(config["HTTP_CACHE_DIR"]))
+        self.tokens = TokenManager(
+            config["EMAIL"], config["PASSWORD"], client=self.client, cache_path=config["TOKEN_CACHE_PATH"]
+        )
+        # Jugadores de la competición: una descarga por tramo para todas las ligas
+        self.publicos = PublicPlayers()
+        self.stores = {
+            clave: SnapshotStore(history=SnapshotHistory(ruta_liga(config["HISTORY_DIR"], liga, self.ligas), TZ))
+            for clave, liga in self.ligas.items()
+        }
+        self.clause_logs = {
+            clave: ClauseLog(ruta_liga(config["CLAUSE_LOG_PATH"], liga, self.ligas))
+            for clave, liga in self.ligas.items()
+        }
+
+    def refrescar(self, force: bool = False) -> dict:
+        """Descarga y publica el tramo de refresco actual de cada liga que aún no lo tenga."""
+        snaps = {}
+        for clave in self.ligas:
+            snaps[clave] = self.refrescar_liga(clave, force)
+        return snaps
+
+    def refrescar_liga(self, clave: str, force: bool = False):
+        liga, store = self.ligas[clave], self.stores[clave]
+        inicio_tramo = last_refresh()
+        publicado = store.history.published()
+        if not force and publicado is not None and publicado >= inicio_tramo.strftime("%Y%m%d%H%M%S"):
+            log.info("[%s] Tramo %s ya publicado (%s)", clave, inicio_tramo, publicado)
+            return None
+
+        inicio = time.perf_counter()
+        snap = refrescar(
+            store, self.tokens, liga.league_id, liga.user_id, self.client, self.clause_logs[clave], self.publicos
+        )
+        store.prune([store.day_start(snap.fetched_at), snap])
+        log.info("[%s] Snapshot %s publicado en %.1fs", clave, snap.id, time.perf_counter() - inicio)
+        return snap
+
+    def run_forever(self):
+        while True:
+            try:
+                self.refrescar()
+            except Exception:
+                log.exception("Error en la descarga; reintento en %ss", RETRY_DELAY)
+                time.sleep(RETRY_DELAY)
+                continue
+
+            siguiente = next_refresh()
+            log.info("Próximo refresco: %s", siguiente)
+            time.sleep(max((siguiente - datetime.now(TZ)).total_seconds(), 1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Descarga en segundo plano de los datos de Biwenger")
+    parser.add_argument("--once", action="store_true", help="descargar el tramo actual y terminar")
+    parser.add_argument("--force", action="store_true", help="descargar aunque el tramo ya esté publicado")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml", help="ruta a secrets.toml")
+    parser.add_argument("--metrics-port", type=int, help="servir métricas Prometheus en /metrics")
+    parser.add_argument("--metrics-jsonl", help="añadir cada span como línea JSON a este fichero")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    metrics.metrics.jsonl_path = args.metrics_jsonl
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    fetcher = Fetcher(cargar_config(args.secrets))
+
+    if args.once:
+        fetcher.refrescar(force=args.force)
+    else:
+        if args.force:
+            fetcher.refrescar(force=True)
+        fetcher.run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from metrics import instrumentado
+
+# Días de histórico usados para ajustar la tendencia
+DIAS_HISTORIA = 30
+# Días hacia delante de la columna `valor_previsto`
+HORIZONTE = 3
+# Semivida (días) de los pesos: los precios recientes cuentan más
+SEMIVIDA = 7.0
+# Amortiguación diaria de la tendencia al proyectar (1 = tendencia lineal)
+AMORTIGUACION = 0.9
+# Variación logarítmica diaria máxima que se proyecta (±15 %)
+PENDIENTE_MAX = 0.15
+
+
+# ==============================
+# MATRIZ JUGADORES × DÍAS
+# ==============================
+def matriz_precios(historico: pd.DataFrame, ids, inicio: datetime, dias: int, tz) -> np.ndarray:
+    """Matriz float (len(ids) × dias) con el último precio de cada jugador en cada día local.
+
+    `historico` tiene columnas id, valor_actual y fetched_at (como devuelve
+    SnapshotHistory.query). Los días sin dato quedan como NaN.
+    """
+    matriz = np.full((len(ids), dias), np.nan)
+    if historico.empty:
+        return matriz
+
+    fila = pd.Index(ids).get_indexer(historico["id"])
+    fechas = historico["fetched_at"].dt.tz_convert(tz)
+    # Días de calendario en hora local: con fechas con zona, un día de cambio de hora no dura 24 h
+    dia = fechas.dt.tz_localize(None).dt.normalize()
+    dia_inicio = pd.Timestamp(inicio).tz_convert(tz).tz_localize(None).normalize()
+    columna = (dia - dia_inicio).dt.days.to_numpy()
+    precio = historico["valor_actual"].to_numpy(dtype="float64", na_value=np.nan)
+
+    validos = (fila >= 0) & (columna >= 0) & (columna < dias) & ~np.isnan(precio)
+    orden = np.argsort(fechas.to_numpy()[validos], kind="stable")
+    fila, columna, precio = fila[validos][orden], columna[validos][orden], precio[validos][orden]
+
+    # Si hay varias descargas el mismo día, se queda la última
+    clave = fila * dias + columna
+    _, ultimo = np.unique(clave[::-1], return_index=True)
+    ultimo = len(clave) - 1 - ultimo
+    matriz[fila[ultimo], columna[ultimo]] = precio[ultimo]
+    return matriz
+
+
+# ==============================
+# AJUSTE Y PREDICCIÓN
+# ==============================
+def pronosticar(precios: np.ndarray, horizonte: int = HORIZONTE, semivida: float = SEMIVIDA,
+                amortiguacion: float = AMORTIGUACION) -> np.ndarray:
+    """Precios previstos (jugadores × horizonte) para todos los jugadores a la vez.
+
+    Ajusta por filas una recta ponderada sobre el logaritmo del precio (pesos
+    exponenciales, los NaN pesan 0) con sumas sobre la matriz, y proyecta
+    desde el último precio conocido con la pendiente amortiguada. Las filas
+    con menos de dos precios se proyectan planas.
+    """
+    jugadores, dias = precios.shape
+    validos = ~np.isnan(precios) & (precios > 0)
+    y = np.log(np.where(validos, precios, 1.0))
+    t = np.arange(dias, dtype="float64")
+    w = np.where(validos, 0.5 ** ((dias - 1 - t) / semivida), 0.0)
+
+    sw = w.sum(axis=1)
+    st = w @ t
+    stt = w @ (t * t)
+    sy = (w * y).sum(axis=1)
+    sty = (w * y) @ t
+    denominador = sw * stt - st * st
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pendiente = np.where(denominador > 1e-9, (sw * sty - st * sy) / denominador, 0.0)
+    pendiente = np.clip(pendiente, -PENDIENTE_MAX, PENDIENTE_MAX)
+
+    # Último precio conocido de cada fila (NaN si no hay ninguno)
+    ultimo_dia = np.where(validos.any(axis=1), dias - 1 - np.argmax(validos[:, ::-1], axis=1), 0)
+    nivel = np.where(validos.any(axis=1), y[np.arange(jugadores), ultimo_dia], np.nan)
+
+    # Pasos amortiguados desde el último precio: sum(phi^k, k=1..h)
+    pasos = np.cumsum(amortiguacion ** np.arange(1, horizonte + 1))
+    return np.exp(nivel[:, None] + pendiente[:, None] * pasos[None, :])
+
+
+# ==============================
+# COLUMNA EN EL FRAME DE JUGADORES
+# ==============================
+@instrumentado("forecast.pronostico_jugadores")
+def pronostico_jugadores(df_jugadores: pd.DataFrame, history, ahora: datetime, tz,
+                         dias=DIAS_HISTORIA, horizonte=HORIZONTE) -> pd.DataFrame:
+    """Añade `valor_previsto` (a `horizonte` días) y `variacion_prevista` a los jugadores.
+
+    Usa el último precio de cada día de los últimos `dias` en el histórico y
+    el precio actual como último día. Si un jugador no tiene el día anterior,
+    se reconstruye con `valor_actual - variacion_diaria`.
+    """
+    inicio = (ahora - timedelta(days=dias - 1)).astimezone(tz)
+    if history is not None:
+        historico = history.query(inicio, ahora, columns=["id", "valor_actual"])
+    else:
+        historico = pd.DataFrame(columns=["id", "valor_actual", "fetched_at"])
+    precios = matriz_precios(historico, df_jugadores["id"], inicio, dias, tz)
+
+    actual = df_jugadores["valor_actual"].to_numpy(dtype="float64", na_value=np.nan)
+    variacion = df_jugadores["variacion_diaria"].to_numpy(dtype="float64", na_value=np.nan)
+    precios[:, -1] = actual
+    sin_ayer = np.isnan(precios[:, -2])
+    precios[sin_ayer, -2] = (actual - variacion)[sin_ayer]
+
+    previsto = pronosticar(precios, horizonte)[:, -1].round()
+    valor_previsto = pd.Series(previsto, index=df_jugadores.index).astype("Int64")
+    return df_jugadores.assign(
+        valor_previsto=valor_previsto,
+        variacion_prevista=valor_previsto - df_jugadores["valor_actual"].astype("Int64"),
+    )
@@ -0,0 +1,86 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+# ==============================
+# CACHÉ DE RESPUESTAS HTTP
+# ==============================
+class ResponseCache:
+    """Caché en disco (JSON comprimido con gzip) de respuestas GET.
+
+    Cada entrada guarda el cuerpo ya parseado junto con sus cabeceras ETag y
+    Last-Modified; la hora de la última validación es la fecha de modificación
+    del fichero. Mientras no ha pasado el TTL se sirve sin red; después se
+    revalida con If-None-Match / If-Modified-Since y un 304 reutiliza la
+    copia local. La clave es solo la URL: no usar con respuestas que
+    dependan de cabeceras de usuario o liga.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._memory = {}
+
+    def _path(self, url: str) -> Path:
+        return self.root / f"{hashlib.sha1(url.encode()).hexdigest()}.json.gz"
+
+    def get(self, url: str):
+        """Entrada guardada para `url` ({"body", "etag", "last_modified", "stored_at"}) o None."""
+        with self._lock:
+            if url in self._memory:
+                return self._memory[url]
+        path = self._path(url)
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+            entry["stored_at"] = path.stat().st_mtime
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._memory[url] = entry
+        return entry
+
+    def put(self, url: str, body, etag=None, last_modified=None):
+        entry = {"body": body, "etag": etag, "last_modified": last_modified}
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(url)
+        tmp = path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        entry["stored_at"] = time.time()
+        with self._lock:
+            self._memory[url] = entry
+        return entry
+
+    def touch(self, url: str, entry):
+        """Marca una entrada como recién validada (tras un 304) sin reescribir el cuerpo."""
+        path = self._path(url)
+        if path.exists():
+            os.utime(path)
+        entry = {**entry, "stored_at": time.time()}
+        with self._lock:
+            self._memory[url] = entry
+        return entry
+
+    @staticmethod
+    def fresh(entry, ttl) -> bool:
+        return entry is not None and ttl is not None and time.time() - entry["stored_at"] < ttl
+
+    @staticmethod
+    def conditional_headers(entry) -> dict:
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
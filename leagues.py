@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+# Clave usada cuando solo se configura LEAGUE_ID / USER_ID
+LIGA_POR_DEFECTO = "principal"
+
+
+# ==============================
+# CONFIGURACIÓN DE LIGAS
+# ==============================
+@dataclass(frozen=True)
+class Liga:
+    clave: str
+    league_id: str
+    user_id: str
+    nombre: str
+
+
+def ligas_desde_config(config) -> dict:
+    """Ligas configuradas, por clave.
+
+    Admite varias ligas en una tabla `LEAGUES` de secrets.toml:
+
+        [LEAGUES.amigos]
+        LEAGUE_ID = "123"
+        USER_ID = "456"
+        NOMBRE = "Liga de los amigos"   # opcional
+
+    o, como antes, una sola liga con LEAGUE_ID y USER_ID en la raíz.
+    """
+    tabla = config.get("LEAGUES")
+    if tabla:
+        return {
+            clave: Liga(clave, str(datos["LEAGUE_ID"]), str(datos["USER_ID"]), datos.get("NOMBRE", clave))
+            for clave, datos in tabla.items()
+        }
+    return {
+        LIGA_POR_DEFECTO: Liga(LIGA_POR_DEFECTO, str(config["LEAGUE_ID"]), str(config["USER_ID"]), LIGA_POR_DEFECTO)
+    }
+
+
+def ruta_liga(ruta, liga: Liga, ligas: dict) -> Path:
+    """Ruta de datos propia de una liga.
+
+    Con una sola liga se usa la ruta tal cual (compatible con instalaciones
+    anteriores); con varias, cada liga va en su subcarpeta o con sufijo.
+    """
+    ruta = Path(ruta)
+    if len(ligas) == 1:
+        return ruta
+    if ruta.suffix:
+        return ruta.with_name(f"{ruta.stem}_{liga.clave}{ruta.suffix}")
+    return ruta / liga.clave
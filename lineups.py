@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from metrics import instrumentado
+
+# Formaciones válidas en Biwenger: jugadores por posición (portero, defensas, centrocampistas, delanteros)
+FORMACIONES = {
+    "3-4-3": (1, 3, 4, 3),
+    "3-5-2": (1, 3, 5, 2),
+    "4-3-3": (1, 4, 3, 3),
+    "4-4-2": (1, 4, 4, 2),
+    "4-5-1": (1, 4, 5, 1),
+    "5-3-2": (1, 5, 3, 2),
+    "5-4-1": (1, 5, 4, 1),
+}
+POSICIONES = ["Portero", "Defensa", "Centrocampista", "Delantero"]
+
+
+@dataclass(frozen=True)
+class MejoresOnces:
+    # Una fila por propietario_id: puntos_maximos y formacion
+    resumen: pd.DataFrame
+    # Booleano alineado con el frame de jugadores: True si el jugador está en el mejor once de su propietario
+    titular: pd.Series
+
+
+# ==============================
+# MEJOR ONCE POR PROPIETARIO
+# ==============================
+@instrumentado("lineups.mejores_onces")
+def mejores_onces(df_jugadores: pd.DataFrame, formaciones: dict = FORMACIONES) -> MejoresOnces:
+    """Mejor once (por `puntos`) de cada propietario en cualquiera de `formaciones`.
+
+    Fijada la formación, las posiciones son independientes: el óptimo es
+    tomar los k mejores de cada posición. Se ordena una vez por
+    (propietario, posición, puntos), se guardan las sumas acumuladas de los
+    k mejores en una matriz propietarios × posiciones × k y cada formación
+    se evalúa para todos los propietarios a la vez. Es exacto; si a un
+    equipo le faltan jugadores en una posición, los huecos puntúan 0.
+    """
+    titular = pd.Series(False, index=df_jugadores.index)
+    df = df_jugadores[df_jugadores["propietario_id"].notna() & df_jugadores["posicion"].isin(POSICIONES)]
+    if df.empty:
+        resumen = pd.DataFrame({"propietario_id": pd.array([], dtype="Int64"), "puntos_maximos": [], "formacion": []})
+        return MejoresOnces(resumen, titular)
+
+    propietarios, fila = np.unique(df["propietario_id"].to_numpy(dtype="int64"), return_inverse=True)
+    posicion = pd.Index(POSICIONES).get_indexer(df["posicion"].astype(object))
+    puntos = df["puntos"].to_numpy(dtype="float64", na_value=np.nan)
+    puntos = np.nan_to_num(puntos)
+
+    # Puesto de cada jugador dentro de (propietario, posición), de más a menos puntos
+    orden = np.lexsort((-puntos, posicion, fila))
+    grupo = fila[orden] * len(POSICIONES) + posicion[orden]
+    inicios = np.flatnonzero(np.r_[True, grupo[1:] != grupo[:-1]])
+    tamanos = np.diff(np.r_[inicios, len(orden)])
+    puesto = np.empty(len(orden), dtype="int64")
+    puesto[orden] = np.arange(len(orden)) - np.repeat(inicios, tamanos)
+
+    cuentas = np.array(list(formaciones.values()))  # formaciones × posiciones
+    k_max = int(cuentas.max())
+    mejores = np.zeros((len(propietarios), len(POSICIONES), k_max))
+    dentro = puesto < k_max
+    mejores[fila[dentro], posicion[dentro], puesto[dentro]] = puntos[dentro]
+    # acumulado[..., k] = suma de los k mejores de la posición
+    acumulado = np.concatenate([np.zeros(mejores.shape[:2] + (1,)), mejores.cumsum(axis=2)], axis=2)
+
+    # propietarios × formaciones
+    totales = acumulado[:, np.arange(len(POSICIONES))[None, :], cuentas].sum(axis=2)
+    elegida = totales.argmax(axis=1)
+
+    resumen = pd.DataFrame({
+        "propietario_id": pd.array(propietarios, dtype="Int64"),
+        "puntos_maximos": totales[np.arange(len(propietarios)), elegida].round().astype("int64"),
+        "formacion": np.array(list(formaciones))[elegida],
+    })
+    titular[df.index] = puesto < cuentas[elegida[fila], posicion]
+    return MejoresOnces(resumen, titular)
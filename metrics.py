@@ -0,0 +1,164 @@
+import contextvars
+import functools
+import json
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Span activo en el contexto actual (cada hilo del pool tiene el suyo)
+_span_actual = contextvars.ContextVar("span_actual", default=None)
+
+
+# ==============================
+# REGISTRO DE SPANS
+# ==============================
+class Metrics:
+    """Registro ligero de spans: duración, bytes recibidos, filas y aciertos de caché.
+
+    Guarda los últimos `max_spans` en memoria para el panel de depuración,
+    acumula agregados por nombre para el formato Prometheus y, si se indica
+    `jsonl_path`, añade cada span terminado como una línea JSON.
+    """
+
+    def __init__(self, max_spans=500, jsonl_path=None):
+        self.jsonl_path = jsonl_path
+        self._recientes = deque(maxlen=max_spans)
+        self._agregados = defaultdict(lambda: {"count": 0, "seconds": 0.0, "bytes": 0, "errors": 0})
+        self._cache = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, nombre: str, **attrs):
+        registro = {"name": nombre, "start": time.time(), "bytes": 0, "rows": None, "cache": None, **attrs}
+        token = _span_actual.set(registro)
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        except Exception as e:
+            registro["error"] = type(e).__name__
+            raise
+        finally:
+            registro["duration_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+            _span_actual.reset(token)
+            self._guardar(registro)
+
+    def _guardar(self, registro: dict):
+        with self._lock:
+            self._recientes.append(registro)
+            agregado = self._agregados[registro["name"]]
+            agregado["count"] += 1
+            agregado["seconds"] += registro["duration_ms"] / 1000
+            agregado["bytes"] += registro["bytes"] or 0
+            agregado["errors"] += "error" in registro
+            if registro["cache"]:
+                self._cache[(registro["name"], registro["cache"])] += 1
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro, default=str) + "\n")
+
+    def recientes(self, n=None) -> list:
+        with self._lock:
+            spans = list(self._recientes)
+        return spans[-n:] if n else spans
+
+    def to_prometheus(self) -> str:
+        """Agregados por span en formato de texto de Prometheus."""
+        with self._lock:
+            agregados = {k: dict(v) for k, v in self._agregados.items()}
+            cache = dict(self._cache)
+
+        lineas = [
+            "# HELP biwenger_span_duration_seconds Duración de cada etapa instrumentada.",
+            "# TYPE biwenger_span_duration_seconds summary",
+        ]
+        for nombre, a in sorted(agregados.items()):
+            lineas.append(f'biwenger_span_duration_seconds_count{{span="{nombre}"}} {a["count"]}')
+            lineas.append(f'biwenger_span_duration_seconds_sum{{span="{nombre}"}} {a["seconds"]:.6f}')
+        lineas += ["# HELP biwenger_span_bytes_total Bytes recibidos de la API.", "# TYPE biwenger_span_bytes_total counter"]
+        lineas += [f'biwenger_span_bytes_total{{span="{n}"}} {a["bytes"]}' for n, a in sorted(agregados.items())]
+        lineas += ["# HELP biwenger_span_errors_total Etapas terminadas con excepción.", "# TYPE biwenger_span_errors_total counter"]
+        lineas += [f'biwenger_span_errors_total{{span="{n}"}} {a["errors"]}' for n, a in sorted(agregados.items())]
+        lineas += ["# HELP biwenger_span_cache_total Resultados de caché por etapa.", "# TYPE biwenger_span_cache_total counter"]
+        lineas += [f'biwenger_span_cache_total{{span="{n}",result="{r}"}} {c}' for (n, r), c in sorted(cache.items())]
+        return "\n".join(lineas) + "\n"
+
+
+metrics = Metrics()
+
+
+# ==============================
+# API DE USO
+# ==============================
+def span(nombre: str, **attrs):
+    return metrics.span(nombre, **attrs)
+
+
+def anotar(**attrs):
+    """Añade atributos al span activo; `bytes` se acumula. No hace nada fuera de un span."""
+    registro = _span_actual.get()
+    if registro is None:
+        return
+    if "bytes" in attrs:
+        registro["bytes"] = (registro["bytes"] or 0) + attrs.pop("bytes")
+    registro.update(attrs)
+
+
+def _es_frame(objeto) -> bool:
+    # pandas no se importa aquí (retrasa el arranque): si nadie lo ha cargado, no hay DataFrames
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(objeto, pd.DataFrame)
+
+
+def _contar_filas(resultado):
+    if _es_frame(resultado):
+        return len(resultado)
+    if isinstance(resultado, tuple):
+        filas = [len(r) for r in resultado if _es_frame(r)]
+        return sum(filas) if filas else None
+    return None
+
+
+def instrumentado(nombre: str):
+    """Decorador: ejecuta la función dentro de un span y anota las filas devueltas."""
+    def decorador(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(nombre) as registro:
+                resultado = fn(*args, **kwargs)
+                if registro["rows"] is None:
+                    registro["rows"] = _contar_filas(resultado)
+                return resultado
+        return wrapper
+    return decorador
+
+
+# ==============================
+# ENDPOINT PROMETHEUS
+# ==============================
+def serve(port: int, host: str = "0.0.0.0", registro: Metrics = None) -> ThreadingHTTPServer:
+    """Sirve `/metrics` en texto Prometheus desde un hilo en segundo plano."""
+    registro = registro or metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = registro.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,91 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from data_loader import PUBLIC_PLAYERS_TTL, get_league_data, get_public_players, get_all_user_players
+from metrics import instrumentado, span
+from refresh_schedule import TZ
+
+
+# ==============================
+# DATOS COMUNES A TODAS LAS LIGAS
+# ==============================
+class PublicPlayers:
+    """Jugadores y equipos de la competición, compartidos por todas las ligas.
+
+    Se descargan y parsean una sola vez cada `ttl` segundos; si varias ligas
+    refrescan a la vez, esperan a la misma descarga en lugar de repetirla.
+    Todas reciben el mismo DataFrame, que se trata como de solo lectura.
+    """
+
+    def __init__(self, ttl=PUBLIC_PLAYERS_TTL):
+        self.ttl = ttl
+        self._df = None
+        self._descargado = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, client=None):
+        with self._lock:
+            if self._df is None or time.monotonic() - self._descargado >= self.ttl:
+                self._df = get_public_players(client=client)
+                self._descargado = time.monotonic()
+            return self._df
+
+
+# ==============================
+# DESCARGA COMPLETA
+# ==============================
+def descargar_datos(token, league_id, user_id, client, clause_log, publicos=None):
+    """Descarga liga, usuarios, jugadores con propietario y cláusulas de una liga.
+
+    Con `publicos` (PublicPlayers) los jugadores de la competición salen de la
+    caché compartida; solo clasificación, plantillas y tablón son de la liga.
+    """
+    obtener_publicos = publicos.get if publicos is not None else get_public_players
+
+    # Peticiones independientes en paralelo: liga, jugadores públicos y cláusulas
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        fut_liga = pool.submit(get_league_data, league_id, token, user_id, client=client)
+        fut_publicos = pool.submit(obtener_publicos, client=client)
+        fut_clausulas = pool.submit(clause_log.update, league_id, user_id, token, client=client)
+
+        # Las plantillas dependen de la lista de usuarios de la liga
+        df_liga, df_usuarios = fut_liga.result()
+        df_all_owned = get_all_user_players(user_id, df_usuarios["id"], league_id, token, client=client)
+
+        df_players_public = fut_publicos.result()
+        df_clausulas = fut_clausulas.result()
+
+    df_jugadores = unir_jugadores(df_players_public, df_all_owned, df_usuarios)
+
+    return df_liga, df_usuarios, df_jugadores, df_clausulas
+
+
+@instrumentado("pipeline.unir_jugadores")
+def unir_jugadores(df_players_public, df_all_owned, df_usuarios):
+    """Join: jugadores públicos + propietario (cláusula, compra) + nombre e icono del usuario."""
+    df_jugadores = df_players_public.merge(df_all_owned, on="id", how="left")
+    df_jugadores = df_jugadores.merge(
+        df_usuarios[["id", "nombre", "imagen"]],
+        left_on="propietario_id",
+        right_on="id",
+        how="left",
+        suffixes=("", "_usuario")
+    )
+    df_jugadores.drop(columns=["id_usuario"], inplace=True)
+    return df_jugadores
+
+
+def refrescar(store, token_manager, league_id, user_id, client, clause_log, publicos=None):
+    """Descarga un snapshot nuevo, lo guarda en el almacén y lo publica como actual."""
+    with span("pipeline.refrescar", league_id=str(league_id)) as registro:
+        frames = token_manager.with_token(
+            lambda token: descargar_datos(token, league_id, user_id, client, clause_log, publicos)
+        )
+        with span("snapshots.add"):
+            snap = store.add(datetime.now(TZ), *frames)
+            if store.history is not None:
+                store.history.publish(snap.id)
+        registro["rows"] = len(snap.jugadores)
+    return snap
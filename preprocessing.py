@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from forecast import pronostico_jugadores
+from lineups import MejoresOnces, mejores_onces
+from metrics import instrumentado
+from snapshot_diff import diff_jugadores
+from snapshots import Snapshot
+from unlock_index import UnlockIndex
+
+
+# ==============================
+# DATOS PREPARADOS
+# ==============================
+@dataclass(frozen=True)
+class DatosPreparados:
+    """Frames listos para las pestañas, calculados una sola vez por snapshot.
+
+    Se comparten entre sesiones y reruns: las pestañas deben filtrar o usar
+    `.assign()` sobre ellos, nunca modificarlos in situ.
+    """
+
+    snapshot_id: str
+    snapshot_diario_id: str
+    liga: pd.DataFrame
+    usuarios: pd.DataFrame
+    jugadores: pd.DataFrame
+    jugadores_diario: pd.DataFrame
+    clausulas: pd.DataFrame
+    desbloqueos: UnlockIndex
+    desbloqueos_diario: UnlockIndex
+    # Cambios por jugador desde el inicio del día (snapshot_diff.diff_jugadores)
+    cambios: pd.DataFrame
+    # Mejor once posible de cada propietario con su plantilla actual (lineups.mejores_onces)
+    onces: MejoresOnces
+
+
+def _preparar_jugadores(df: pd.DataFrame, tz) -> pd.DataFrame:
+    df = df.copy()
+    df["fecha_desbloqueo"] = df["fecha_desbloqueo"].dt.tz_convert(tz)
+    # Epoch en segundos (NaN si no hay cláusula) para calcular horas restantes sin tocar fechas
+    df["desbloqueo_s"] = (df["fecha_desbloqueo"] - pd.Timestamp(0, tz="UTC")).dt.total_seconds()
+    df["dia_desbloqueo"] = df["fecha_desbloqueo"].dt.normalize()
+    df["fecha_desbloqueo_fmt"] = df["fecha_desbloqueo"].dt.strftime("%d/%m/%Y %H:%M")
+    return df
+
+
+@instrumentado("preprocessing.preparar")
+def preparar(actual: Snapshot, diario: Snapshot, tz, history=None) -> DatosPreparados:
+    """Convierte fechas a hora local y añade las columnas derivadas que usan las pestañas.
+
+    Con `history` (SnapshotHistory) la previsión de valor usa los precios de
+    los últimos días; sin él, solo el precio actual y la variación diaria.
+    """
+    jugadores = _preparar_jugadores(actual.jugadores, tz)
+    jugadores = pronostico_jugadores(jugadores, history, actual.fetched_at, tz)
+    # La previsión también va en el frame de inicio del día (pestaña de hoy)
+    prevision = jugadores.set_index("id")[["valor_previsto", "variacion_prevista"]]
+    jugadores_diario = _preparar_jugadores(diario.jugadores, tz).join(prevision, on="id")
+
+    clausulas = actual.clausulas.copy()
+    clausulas["entry_date"] = clausulas["entry_date"].dt.tz_convert(tz)
+
+    return DatosPreparados(
+        snapshot_id=actual.id,
+        snapshot_diario_id=diario.id,
+        liga=actual.liga,
+        usuarios=actual.usuarios,
+        jugadores=jugadores,
+        jugadores_diario=jugadores_diario,
+        clausulas=clausulas,
+        desbloqueos=UnlockIndex(jugadores),
+        desbloqueos_diario=UnlockIndex(jugadores_diario),
+        cambios=diff_jugadores(diario.jugadores, actual.jugadores),
+        onces=mejores_onces(jugadores),
+    )
+
+
+def horas_restantes(df: pd.DataFrame, ahora: pd.Timestamp) -> np.ndarray:
+    """Horas hasta el desbloqueo de cada fila respecto a `ahora` (NaN si no hay cláusula)."""
+    return (df["desbloqueo_s"].to_numpy() - ahora.timestamp()) / 3600
@@ -0,0 +1,52 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+# ==============================
+# ZONA HORARIA
+# ==============================
+TZ = ZoneInfo("Europe/Madrid")
+
+
+# ==============================
+# HORARIO DE REFRESCO
+# ==============================
+def refresh_times(day) -> list:
+    """Horas de refresco de un día concreto."""
+    # Viernes → refresco a las horas y media (7:30, 8:30, ..., 21:30)
+    if day.weekday() == 4:  # 0=lunes ... 4=viernes
+        return [time(h, 30) for h in range(7, 22)]  # 7:30 a 21:30
+    # Resto de días → 3 veces al día
+    return [time(7, 10), time(12, 30), time(21, 10)]
+
+
+def last_refresh(now: datetime = None) -> datetime:
+    """Último instante de refresco igual o anterior a `now`."""
+    now = now or datetime.now(TZ)
+    today_times = [datetime.combine(now.date(), t, tzinfo=TZ) for t in refresh_times(now.date())]
+    last = max([dt for dt in today_times if dt <= now], default=None)
+    if last is None:
+        ayer = now.date() - timedelta(days=1)
+        last = datetime.combine(ayer, refresh_times(ayer)[-1], tzinfo=TZ)
+    return last
+
+
+def next_refresh(now: datetime = None) -> datetime:
+    """Próximo instante de refresco estrictamente posterior a `now`."""
+    now = now or datetime.now(TZ)
+    for offset in range(8):
+        day = now.date() + timedelta(days=offset)
+        for t in refresh_times(day):
+            dt = datetime.combine(day, t, tzinfo=TZ)
+            if dt > now:
+                return dt
+    raise RuntimeError("Horario de refresco vacío")
+
+
+def next_refresh_key(now: datetime = None) -> str:
+    """Devuelve una clave distinta cuando toca refrescar los datos."""
+    return last_refresh(now).strftime("%Y%m%d%H%M")
+
+
+def refresh_key_start(key: str) -> datetime:
+    """Instante de refresco que representa una clave de next_refresh_key."""
+    return datetime.strptime(key, "%Y%m%d%H%M").replace(tzinfo=TZ)
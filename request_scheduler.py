@@ -0,0 +1,165 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from metrics import anotar
+
+# ==============================
+# PRIORIDADES
+# ==============================
+# Menor número = antes. Clasificación, login y tablón de cláusulas primero;
+# las plantillas (muchas peticiones, toleran esperar) al final.
+PRIORIDAD_ALTA = 0
+PRIORIDAD_NORMAL = 1
+PRIORIDAD_BAJA = 2
+
+# ==============================
+# CONFIGURACIÓN POR DEFECTO
+# ==============================
+# Peticiones por segundo sostenidas y ráfaga máxima, por host
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 10
+# Peticiones simultáneas por host
+DEFAULT_CONCURRENCY = 6
+# Reintentos tras un 429 antes de devolver la respuesta al llamador
+DEFAULT_MAX_429 = 3
+# Pausa si el 429 no trae Retry-After (segundos)
+DEFAULT_RETRY_AFTER = 5.0
+# Tras un 429 el ritmo se reduce a la mitad, sin bajar de este mínimo
+MIN_RATE = 0.5
+
+
+def retry_after_segundos(valor, por_defecto=DEFAULT_RETRY_AFTER) -> float:
+    """Segundos de espera de una cabecera Retry-After (segundos o fecha HTTP)."""
+    if not valor:
+        return por_defecto
+    try:
+        return max(float(valor), 0.0)
+    except ValueError:
+        pass
+    try:
+        fecha = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return por_defecto
+    return max((fecha - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class _Host:
+    """Estado de un host: token bucket, pausa por 429, peticiones activas y cola."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.tokens = float(burst)
+        self.actualizado = time.monotonic()
+        self.pausa_hasta = 0.0
+        self.activas = 0
+        self.cola = []
+
+    def recargar(self, ahora, burst):
+        self.tokens = min(self.tokens + (ahora - self.actualizado) * self.rate, burst)
+        self.actualizado = ahora
+
+
+# ==============================
+# PLANIFICADOR
+# ==============================
+class RequestScheduler:
+    """Regula las peticiones a la API de Biwenger.
+
+    Por cada host mantiene un token bucket (`rate` peticiones por segundo con
+    ráfagas de hasta `burst`) y un máximo de `max_concurrency` peticiones en
+    vuelo. Las peticiones esperan en una cola por prioridad y, dentro de la
+    misma prioridad, por orden de llegada. Un 429 pausa el host durante el
+    Retry-After, reduce el ritmo a la mitad y reintenta la petición; cada
+    respuesta correcta lo recupera poco a poco hasta `rate`.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, max_concurrency=DEFAULT_CONCURRENCY,
+                 max_429=DEFAULT_MAX_429):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.max_429 = max_429
+        self._hosts = {}
+        self._orden = itertools.count()
+        self._cond = threading.Condition()
+
+    def _host(self, host) -> _Host:
+        if host not in self._hosts:
+            self._hosts[host] = _Host(self.rate, self.burst)
+        return self._hosts[host]
+
+    def _espera(self, h: _Host, turno) -> float:
+        """0 si el turno puede salir ya; si no, segundos a esperar (None = hasta aviso)."""
+        if h.cola[0] != turno or h.activas >= self.max_concurrency:
+            return None
+        ahora = time.monotonic()
+        if ahora < h.pausa_hasta:
+            return h.pausa_hasta - ahora
+        h.recargar(ahora, self.burst)
+        if h.tokens < 1:
+            return (1 - h.tokens) / h.rate
+        return 0
+
+    @contextmanager
+    def turno(self, host: str, prioridad=PRIORIDAD_NORMAL):
+        """Bloquea hasta que `host` admite una petición más con esta prioridad."""
+        inicio = time.monotonic()
+        with self._cond:
+            h = self._host(host)
+            turno = (prioridad, next(self._orden))
+            heapq.heappush(h.cola, turno)
+            while (espera := self._espera(h, turno)) != 0:
+                self._cond.wait(espera)
+            heapq.heappop(h.cola)
+            h.tokens -= 1
+            h.activas += 1
+            # El siguiente de la cola puede tener ya hueco y token
+            self._cond.notify_all()
+        esperado = time.monotonic() - inicio
+        if esperado > 0.001:
+            anotar(throttled_ms=round(esperado * 1000, 3))
+        try:
+            yield
+        finally:
+            with self._cond:
+                h.activas -= 1
+                self._cond.notify_all()
+
+    def _limitado(self, host: str, retry_after):
+        with self._cond:
+            h = self._host(host)
+            h.pausa_hasta = max(h.pausa_hasta, time.monotonic() + retry_after_segundos(retry_after))
+            h.rate = max(h.rate / 2, MIN_RATE)
+            # Sin ráfaga al reanudar: los tokens se acumulan desde el fin de la pausa
+            h.tokens = min(h.tokens, 0.0)
+            h.actualizado = h.pausa_hasta
+            self._cond.notify_all()
+
+    def _correcta(self, host: str):
+        with self._cond:
+            h = self._host(host)
+            h.rate = min(h.rate + self.rate * 0.05, self.rate)
+
+    def ejecutar(self, url: str, enviar, prioridad=PRIORIDAD_NORMAL):
+        """Ejecuta `enviar()` (que devuelve una respuesta de requests) respetando los límites.
+
+        Tras `max_429` respuestas 429 seguidas se devuelve la última y el
+        llamador decide (raise_for_status).
+        """
+        host = urlparse(url).netloc
+        for intento in range(self.max_429 + 1):
+            with self.turno(host, prioridad):
+                resp = enviar()
+            if resp.status_code != 429:
+                self._correcta(host)
+                return resp
+            anotar(rate_limited=intento + 1)
+            if intento < self.max_429:
+                self._limitado(host, resp.headers.get("Retry-After"))
+        return resp
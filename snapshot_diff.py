@@ -0,0 +1,79 @@
+import pandas as pd
+
+from metrics import instrumentado
+
+# Columnas de jugador/propiedad que se comparan entre snapshots
+CAMPOS = ["valor_actual", "propietario_id", "valor_clausula", "fecha_desbloqueo", "loan_to", "loan_duration"]
+
+# Tipos de cambio (una columna booleana por tipo en el resultado)
+CAMBIOS = [
+    "alta", "baja", "cambio_valor", "cambio_propietario",
+    "clausula_nueva", "clausula_eliminada", "cambio_clausula", "cambio_cesion",
+]
+
+
+def _distinto(a: pd.Series, b: pd.Series) -> pd.Series:
+    """a != b tratando dos nulos como iguales y un nulo frente a un valor como distinto."""
+    iguales = (a == b).fillna(False).astype(bool)
+    return ~iguales & ~(a.isna() & b.isna())
+
+
+# ==============================
+# DIFERENCIAS ENTRE SNAPSHOTS
+# ==============================
+@instrumentado("snapshot_diff.diff_jugadores")
+def diff_jugadores(antes: pd.DataFrame, despues: pd.DataFrame) -> pd.DataFrame:
+    """Cambios por jugador entre dos snapshots, con un solo join por `id`.
+
+    Devuelve solo las filas con algún cambio: valores antes/después de cada
+    campo de CAMPOS, `delta_valor` y `delta_clausula`, y una columna booleana
+    por cada tipo de CAMBIOS. `nombre` sale del snapshot más reciente que
+    contenga al jugador.
+    """
+    columnas = ["id", "nombre", *CAMPOS]
+    m = antes[columnas].merge(
+        despues[columnas], on="id", how="outer", suffixes=("_antes", "_despues"), indicator=True
+    )
+    a = {c: m[f"{c}_antes"] for c in CAMPOS}
+    d = {c: m[f"{c}_despues"] for c in CAMPOS}
+    en_ambos = (m["_merge"] == "both").to_numpy()
+
+    tiene_clausula_a = a["valor_clausula"].notna()
+    tiene_clausula_d = d["valor_clausula"].notna()
+    flags = pd.DataFrame({
+        "alta": m["_merge"] == "right_only",
+        "baja": m["_merge"] == "left_only",
+        "cambio_valor": _distinto(a["valor_actual"], d["valor_actual"]) & en_ambos,
+        "cambio_propietario": _distinto(a["propietario_id"], d["propietario_id"]) & en_ambos,
+        "clausula_nueva": ~tiene_clausula_a & tiene_clausula_d,
+        "clausula_eliminada": tiene_clausula_a & ~tiene_clausula_d,
+        "cambio_clausula": (
+            tiene_clausula_a & tiene_clausula_d
+            & (_distinto(a["valor_clausula"], d["valor_clausula"]) | _distinto(a["fecha_desbloqueo"], d["fecha_desbloqueo"]))
+        ),
+        "cambio_cesion": (
+            (_distinto(a["loan_to"], d["loan_to"]) | _distinto(a["loan_duration"], d["loan_duration"])) & en_ambos
+        ),
+    }, index=m.index)
+
+    cambios = m.drop(columns=["nombre_antes", "nombre_despues", "_merge"]).assign(
+        nombre=m["nombre_despues"].fillna(m["nombre_antes"]),
+        delta_valor=d["valor_actual"] - a["valor_actual"],
+        delta_clausula=d["valor_clausula"] - a["valor_clausula"],
+        **flags,
+    )
+    return cambios[flags.any(axis=1).to_numpy()].reset_index(drop=True)
+
+
+def transferencias(cambios: pd.DataFrame, df_usuarios: pd.DataFrame) -> pd.DataFrame:
+    """Cambios de propietario con los nombres del anterior y el nuevo (libre si no hay)."""
+    nombres = df_usuarios.set_index("id")["nombre"]
+    df = cambios[cambios["cambio_propietario"]]
+    return pd.DataFrame({
+        "id": df["id"],
+        "nombre": df["nombre"],
+        "de": df["propietario_id_antes"].map(nombres).fillna("Libre"),
+        "a": df["propietario_id_despues"].map(nombres).fillna("Libre"),
+        "valor_actual": df["valor_actual_despues"],
+        "valor_clausula": df["valor_clausula_despues"],
+    })
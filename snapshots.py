@@ -0,0 +1,306 @@
+import bisect
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+# Hora a partir de la cual una descarga cuenta como "inicio del día"
+DAY_START = time(0, 1)
+
+# Snapshots en memoria por defecto: el actual y el de inicio del día
+MAX_SNAPSHOTS = 2
+
+FRAMES = ("liga", "usuarios", "jugadores", "clausulas")
+
+# Columnas enteras (nullable) de cada tabla en el histórico, si no vienen ya tipadas
+INT_COLUMNS = {
+    "liga": ["id"],
+    "usuarios": ["id", "puntos", "valor_equipo", "variacion_valor", "tamano_equipo", "posicion"],
+    "jugadores": [
+        "id", "teamID", "puntos", "valor_actual", "variacion_diaria", "propietario_id",
+        "valor_clausula", "precio_compra", "loan_duration",
+    ],
+    "clausulas": ["player_id", "from_id", "to_id", "amount"],
+}
+
+
+# ==============================
+# SNAPSHOT
+# ==============================
+@dataclass(frozen=True)
+class Snapshot:
+    """Resultado completo de una descarga, identificado por su hora de descarga."""
+
+    id: str
+    fetched_at: datetime
+    liga: pd.DataFrame
+    usuarios: pd.DataFrame
+    jugadores: pd.DataFrame
+    clausulas: pd.DataFrame
+
+
+def snapshot_id(fetched_at: datetime) -> str:
+    return fetched_at.strftime("%Y%m%d%H%M%S")
+
+
+def _compartible(df: pd.DataFrame) -> pd.DataFrame:
+    """Frame para guardar en memoria compartida: sin columnas object (texto en Arrow)."""
+    objetos = [col for col in df.columns if df[col].dtype == object]
+    if not objetos:
+        return df
+    return df.astype({col: "string" for col in objetos})
+
+
+def _copia_al_escribir() -> bool:
+    """True si pandas usa copy-on-write: siempre desde pandas 3; en pandas 2, solo si se activa."""
+    return int(pd.__version__.split(".")[0]) >= 3 or pd.options.mode.copy_on_write is True
+
+
+def _vista(snap: Snapshot) -> Snapshot:
+    """Copia superficial de los frames: con copy-on-write comparten memoria con los
+    del almacén, pero cualquier modificación en una sesión crea su propia copia.
+    Sin copy-on-write se entregan copias completas, para no tocar el snapshot compartido."""
+    profunda = not _copia_al_escribir()
+    return replace(snap, **{nombre: getattr(snap, nombre).copy(deep=profunda) for nombre in FRAMES})
+
+
+def tamano(snap: Snapshot) -> int:
+    """Bytes ocupados por los frames de un snapshot."""
+    return int(sum(getattr(snap, nombre).memory_usage(deep=True).sum() for nombre in FRAMES))
+
+
+# ==============================
+# HISTÓRICO EN DISCO (PARQUET)
+# ==============================
+class SnapshotHistory:
+    """Histórico columnar de todas las descargas.
+
+    Cada tabla se guarda en `<root>/<tabla>/fecha=YYYY-MM-DD/<snapshot_id>.parquet`
+    con tipos explícitos, de modo que las consultas por rango de fechas solo
+    leen las particiones necesarias.
+    """
+
+    def __init__(self, root, tz):
+        self.root = Path(root)
+        self.tz = tz
+
+    @staticmethod
+    def _tipar(nombre: str, df: pd.DataFrame) -> pd.DataFrame:
+        df = df.copy()
+        for col in INT_COLUMNS[nombre]:
+            if col in df and not pd.api.types.is_integer_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors="coerce").round().astype("Int64")
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].astype("string")
+        return df
+
+    def _path(self, nombre: str, snap_id: str) -> Path:
+        fecha = datetime.strptime(snap_id, "%Y%m%d%H%M%S").date().isoformat()
+        return self.root / nombre / f"fecha={fecha}" / f"{snap_id}.parquet"
+
+    def append(self, snap: Snapshot):
+        fetched_at = pd.Timestamp(snap.fetched_at).tz_convert("UTC")
+        for nombre in FRAMES:
+            df = self._tipar(nombre, getattr(snap, nombre))
+            df["snapshot_id"] = snap.id
+            df["fetched_at"] = fetched_at
+            path = self._path(nombre, snap.id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+
+    def ids(self, desde=None):
+        """Ids de snapshot guardados (ordenados), opcionalmente desde una fecha."""
+        base = self.root / "jugadores"
+        if not base.exists():
+            return []
+        particiones = sorted(p for p in base.glob("fecha=*") if desde is None or p.name >= f"fecha={desde.isoformat()}")
+        return [f.stem for p in particiones for f in sorted(p.glob("*.parquet"))]
+
+    def load(self, snap_id: str) -> Snapshot:
+        frames = {}
+        for nombre in FRAMES:
+            df = pd.read_parquet(self._path(nombre, snap_id))
+            frames[nombre] = df.drop(columns=["snapshot_id", "fetched_at"])
+        fetched_at = datetime.strptime(snap_id, "%Y%m%d%H%M%S").replace(tzinfo=self.tz)
+        return Snapshot(snap_id, fetched_at, **frames)
+
+    def publish(self, snap_id: str):
+        """Marca `snap_id` como snapshot actual (escritura atómica de `current.json`)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / "current.json.tmp"
+        tmp.write_text(json.dumps({"id": snap_id}), encoding="utf-8")
+        os.replace(tmp, self.root / "current.json")
+
+    def published(self):
+        """Id del último snapshot publicado, o None."""
+        try:
+            return json.loads((self.root / "current.json").read_text(encoding="utf-8"))["id"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def first_after(self, moment: datetime):
+        """Id del primer snapshot guardado en `moment` o después, o None."""
+        minimo = snapshot_id(moment.astimezone(self.tz))
+        return next((i for i in self.ids(desde=moment.astimezone(self.tz).date()) if i >= minimo), None)
+
+    def query(self, start: datetime, end: datetime, player_ids=None, owner_ids=None, columns=None, tabla="jugadores") -> pd.DataFrame:
+        """Histórico de `tabla` entre `start` y `end`, filtrado por jugador y/o propietario.
+
+        Solo se leen las particiones de fecha del rango y las columnas pedidas.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        base = self.root / tabla
+        if not base.exists():
+            return pd.DataFrame(columns=columns)
+
+        dataset = ds.dataset(
+            base,
+            format="parquet",
+            partitioning=ds.partitioning(pa.schema([("fecha", pa.string())]), flavor="hive"),
+        )
+        start_utc = pd.Timestamp(start).tz_convert("UTC")
+        end_utc = pd.Timestamp(end).tz_convert("UTC")
+        tipo_ts = dataset.schema.field("fetched_at").type
+
+        filtro = (
+            (ds.field("fecha") >= start.astimezone(self.tz).date().isoformat())
+            & (ds.field("fecha") <= end.astimezone(self.tz).date().isoformat())
+            & (ds.field("fetched_at") >= pa.scalar(start_utc, type=tipo_ts))
+            & (ds.field("fetched_at") <= pa.scalar(end_utc, type=tipo_ts))
+        )
+        if player_ids is not None:
+            filtro &= ds.field("id").isin(list(player_ids))
+        if owner_ids is not None:
+            filtro &= ds.field("propietario_id").isin(list(owner_ids))
+
+        if columns is not None:
+            columns = list(dict.fromkeys([*columns, "snapshot_id", "fetched_at"]))
+        return dataset.to_table(columns=columns, filter=filtro).to_pandas()
+
+
+# ==============================
+# ALMACÉN EN MEMORIA
+# ==============================
+class SnapshotStore:
+    """Snapshots ordenados por hora de descarga.
+
+    Permite obtener la vista de inicio del día (primer snapshot tras las
+    00:01) sin repetir la descarga completa. Si se le da un histórico, cada
+    snapshot nuevo se persiste en disco y las búsquedas que no están en
+    memoria se resuelven leyendo del histórico.
+
+    La memoria es una caché LRU acotada: como mucho `max_snapshots` y, si se
+    indica, `max_bytes` en total; al insertar se descartan los menos usados
+    (siguen en el histórico). Los frames se entregan como vistas de solo
+    lectura compartidas, no como copias por sesión.
+    """
+
+    def __init__(self, history=None, max_snapshots=MAX_SNAPSHOTS, max_bytes=None):
+        self.history = history
+        self.max_snapshots = max_snapshots
+        self.max_bytes = max_bytes
+        self._snapshots = []
+        self._uso = OrderedDict()  # id -> bytes, del menos al más usado
+        self._lock = threading.Lock()
+
+    def _insert(self, snap: Snapshot) -> Snapshot:
+        with self._lock:
+            previo = next((s for s in self._snapshots if s.id == snap.id), None)
+            if previo is not None:
+                self._uso.move_to_end(previo.id)
+                return previo
+            snap = replace(snap, **{nombre: _compartible(getattr(snap, nombre)) for nombre in FRAMES})
+            keys = [s.fetched_at for s in self._snapshots]
+            self._snapshots.insert(bisect.bisect_right(keys, snap.fetched_at), snap)
+            self._uso[snap.id] = tamano(snap)
+            self._evict(conservar=snap.id)
+            return snap
+
+    def _evict(self, conservar: str):
+        """Descarta los menos usados hasta cumplir los límites (nunca `conservar`)."""
+        def excede():
+            if len(self._uso) > self.max_snapshots:
+                return True
+            return self.max_bytes is not None and sum(self._uso.values()) > self.max_bytes
+
+        while len(self._uso) > 1 and excede():
+            victima = next(i for i in self._uso if i != conservar)
+            del self._uso[victima]
+            self._snapshots = [s for s in self._snapshots if s.id != victima]
+
+    def _usar(self, snap):
+        """Marca `snap` como usado y devuelve una vista para el llamador."""
+        if snap is None:
+            return None
+        with self._lock:
+            if snap.id in self._uso:
+                self._uso.move_to_end(snap.id)
+        return _vista(snap)
+
+    @property
+    def memoria(self) -> int:
+        """Bytes ocupados por los snapshots en memoria."""
+        with self._lock:
+            return sum(self._uso.values())
+
+    def add(self, fetched_at: datetime, liga, usuarios, jugadores, clausulas) -> Snapshot:
+        snap = Snapshot(snapshot_id(fetched_at), fetched_at, liga, usuarios, jugadores, clausulas)
+        snap = self._insert(snap)
+        if self.history is not None:
+            self.history.append(snap)
+        return _vista(snap)
+
+    def get(self, snap_id: str):
+        with self._lock:
+            snap = next((s for s in self._snapshots if s.id == snap_id), None)
+        return self._usar(snap)
+
+    def load(self, snap_id: str):
+        """Snapshot por id, leyéndolo del histórico si ya no está en memoria."""
+        snap = self.get(snap_id)
+        if snap is None and self.history is not None:
+            snap = _vista(self._insert(self.history.load(snap_id)))
+        return snap
+
+    def latest(self):
+        with self._lock:
+            snap = self._snapshots[-1] if self._snapshots else None
+        return self._usar(snap)
+
+    def first_after(self, moment: datetime):
+        """Primer snapshot descargado en `moment` o después, o None."""
+        with self._lock:
+            keys = [s.fetched_at for s in self._snapshots]
+            i = bisect.bisect_left(keys, moment)
+            en_memoria = self._snapshots[i] if i < len(self._snapshots) else None
+
+        if self.history is not None:
+            snap_id = self.history.first_after(moment)
+            if snap_id is not None and (en_memoria is None or snap_id < en_memoria.id):
+                return _vista(self._insert(self.history.load(snap_id)))
+        return self._usar(en_memoria)
+
+    def day_start(self, now: datetime):
+        """Primer snapshot del día de `now` tomado después de las 00:01 (misma zona horaria)."""
+        ref = datetime.combine(now.date(), DAY_START, tzinfo=now.tzinfo)
+        if now < ref:
+            ref -= timedelta(days=1)
+        return self.first_after(ref)
+
+    def prune(self, keep):
+        """Descarta de memoria todos los snapshots salvo los indicados (el histórico no se toca)."""
+        keep_ids = {s.id for s in keep if s is not None}
+        with self._lock:
+            self._snapshots = [s for s in self._snapshots if s.id in keep_ids]
+            for snap_id in [i for i in self._uso if i not in keep_ids]:
+                del self._uso[snap_id]
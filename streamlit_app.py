@@ -1,18 +1,12 @@
 import streamlit as st 
-import pandas as pd
-import plotly.express as px
-from datetime import datetime, time, timedelta
-from zoneinfo import ZoneInfo
+from datetime import datetime, timedelta
 
 st.stop()
 
-from data_loader import (
-    get_biwenger_token,
-    get_league_data,
-    get_public_players,
-    get_user_players,
-    obtener_clausulas_ejecutadas,
-)
+from leagues import ligas_desde_config, ruta_liga
+from refresh_schedule import TZ, next_refresh_key, refresh_key_start
+import metrics
+from metrics import span
 
 # ==============================
 # CONFIG STREAMLIT
@@ -20,338 +14,392 @@ from data_loader import (
 st.set_page_config(page_title="📊 Jugadores Biwenger", layout="wide")
 st.title("📊 Jugadores Biwenger")
 
+# Lo pesado se importa después del título para que la página se pinte antes
+# (pandas y pyarrow tardan ~0,5 s en frío). plotly (charts) solo se carga en
+# las pestañas con gráficas y el cliente HTTP (requests) solo si la app
+# descarga datos ella misma.
+import pandas as pd
+from snapshots import SnapshotHistory, SnapshotStore
+from table_renderer import COLUMNAS_IMAGEN, ORDEN_CLAUSULAS, clasificacion, grid_paginado, tabla_clausulas, tabla_clausulas_html, tabla_clausulazos_html
+from clause_optimizer import LIMITES_POSICION, MAX_POR_POSICION, OBJETIVOS, candidatos, clausulazos_por_propietario, optimizar
+from snapshot_diff import transferencias
+from preprocessing import DatosPreparados, horas_restantes, preparar
+
 # ==============================
 # VARIABLES SECRETAS
 # ==============================
 EMAIL = st.secrets["EMAIL"]
 PASSWORD = st.secrets["PASSWORD"]
-LEAGUE_ID = st.secrets["LEAGUE_ID"]
-USER_ID = st.secrets["USER_ID"]
+# Ligas a servir: tabla [LEAGUES.<clave>] o, con una sola liga, LEAGUE_ID y USER_ID
+LIGAS = ligas_desde_config(st.secrets)
+# Opcional: fichero donde persistir el token entre reinicios
+TOKEN_CACHE_PATH = st.secrets.get("TOKEN_CACHE_PATH")
+# Carpeta del histórico de snapshots en Parquet
+HISTORY_DIR = st.secrets.get("HISTORY_DIR", "data/historico")
+# Registro persistente de cláusulas ejecutadas
+CLAUSE_LOG_PATH = st.secrets.get("CLAUSE_LOG_PATH", "data/clausulas.parquet")
+# Caché en disco de respuestas públicas (JSON de la competición)
+HTTP_CACHE_DIR = st.secrets.get("HTTP_CACHE_DIR", "data/http_cache")
+# Presupuesto de memoria (MB) para los snapshots de cada liga; sin él, solo el límite de 2 snapshots
+SNAPSHOT_CACHE_MB = st.secrets.get("SNAPSHOT_CACHE_MB")
+# Si hay un fetcher.py en marcha, la app solo lee los snapshots que publica
+BACKGROUND_FETCHER = bool(st.secrets.get("BACKGROUND_FETCHER", False))
+# Métricas: fichero JSON lines y puerto del endpoint Prometheus (/metrics), ambos opcionales
+METRICS_PATH = st.secrets.get("METRICS_PATH")
+METRICS_PORT = st.secrets.get("METRICS_PORT")
 
 # ==============================
-# ZONA HORARIA
+# CARGA DE DATOS
 # ==============================
-TZ = ZoneInfo("Europe/Madrid")
+@st.cache_resource
+def start_metrics() -> None:
+    """Configura la exportación de métricas una sola vez por proceso."""
+    metrics.metrics.jsonl_path = METRICS_PATH
+    if METRICS_PORT:
+        metrics.serve(int(METRICS_PORT))
+
+
+@st.cache_resource
+def get_client() -> "BiwengerClient":
+    """Cliente HTTP compartido entre sesiones (pool de conexiones keep-alive)."""
+    from biwenger_client import BiwengerClient
+    from data_loader import HEADERS_BASE
+    from http_cache import ResponseCache
+    return BiwengerClient(headers=HEADERS_BASE, cache=ResponseCache(HTTP_CACHE_DIR))
+
+
+@st.cache_resource
+def get_token_manager() -> "TokenManager":
+    """Token compartido entre sesiones y claves de refresco; solo se hace login al caducar."""
+    from token_manager import TokenManager
+    return TokenManager(EMAIL, PASSWORD, client=get_client(), cache_path=TOKEN_CACHE_PATH)
+
+
+@st.cache_resource
+def get_public_players() -> "PublicPlayers":
+    """Jugadores de la competición: una descarga compartida por todas las ligas y sesiones."""
+    from pipeline import PublicPlayers
+    return PublicPlayers()
+
+
+@st.cache_resource
+def get_snapshot_store(clave_liga: str) -> SnapshotStore:
+    """Snapshots de una liga, compartidos entre sesiones y persistidos en su histórico."""
+    ruta = ruta_liga(HISTORY_DIR, LIGAS[clave_liga], LIGAS)
+    max_bytes = int(float(SNAPSHOT_CACHE_MB) * 1e6) if SNAPSHOT_CACHE_MB else None
+    return SnapshotStore(history=SnapshotHistory(ruta, TZ), max_bytes=max_bytes)
+
+
+@st.cache_resource
+def get_clause_log(clave_liga: str) -> "ClauseLog":
+    """Registro de cláusulas de una liga; cada refresco solo descarga las entradas nuevas."""
+    from clause_log import ClauseLog
+    return ClauseLog(ruta_liga(CLAUSE_LOG_PATH, LIGAS[clave_liga], LIGAS))
+
+
+# Solo guarda ids de snapshot; las claves de refresco antiguas caducan en un día
+@st.cache_data(max_entries=16 * len(LIGAS), ttl=timedelta(days=1))
+def load_data(dummy_key: str, clave_liga: str):
+    store = get_snapshot_store(clave_liga)
+
+    # Si este tramo de refresco ya se descargó (p. ej. antes de un reinicio), se lee del histórico
+    with span("app.load_data") as registro:
+        actual = store.first_after(refresh_key_start(dummy_key))
+        registro["cache"] = "miss" if actual is None else "hit"
+    if actual is None:
+        from pipeline import refrescar
+
+        liga = LIGAS[clave_liga]
+        actual = refrescar(
+            store, get_token_manager(), liga.league_id, liga.user_id,
+            get_client(), get_clause_log(clave_liga), get_public_players(),
+        )
+
+    # Se devuelve solo el id: los frames se leen del almacén compartido, sin copias por sesión
+    return actual.id
+
+
+def snapshot_actual(clave_liga: str):
+    """Snapshot a mostrar: el publicado por fetcher.py o, sin fetcher, el del tramo actual."""
+    store = get_snapshot_store(clave_liga)
+    if BACKGROUND_FETCHER:
+        snap_id = store.history.published()
+        if snap_id is None:
+            return None
+        actual = store.load(snap_id)
+    else:
+        actual = store.load(load_data(next_refresh_key(), clave_liga))
 
-# ==============================
-# FUNCIONES DE REFRESCO
-# ==============================
-def next_refresh_key() -> str:
-    """Devuelve una clave distinta cuando toca refrescar los datos."""
-    now = datetime.now(TZ)
-
-    # Viernes → refresco a las horas y media (7:30, 8:30, ..., 21:30)
-    if now.weekday() == 4:  # 0=lunes ... 4=viernes
-        refresh_times = [time(h, 30) for h in range(7, 22)]  # 7:30 a 21:30
-        today_times = [datetime.combine(now.date(), t, tzinfo=TZ) for t in refresh_times]
-        last_refresh = max([dt for dt in today_times if dt <= now], default=None)
-        if last_refresh is None:
-            last_refresh = datetime.combine(now.date() - timedelta(days=1), refresh_times[-1], tzinfo=TZ)
-        return last_refresh.strftime("%Y%m%d%H%M")
-
-    # Resto de días → 3 veces al día
-    refresh_times = [time(7, 10), time(12, 30), time(21, 10)]
-    today_times = [datetime.combine(now.date(), t, tzinfo=TZ) for t in refresh_times]
-    last_refresh = max([dt for dt in today_times if dt <= now], default=None)
-    if last_refresh is None:
-        last_refresh = datetime.combine(now.date() - timedelta(days=1), refresh_times[-1], tzinfo=TZ)
-    return last_refresh.strftime("%Y%m%d%H%M")
-
-
-def daily_refresh_key() -> str:
-    """Clave que cambia solo una vez al día a las 00:01."""
-    now = datetime.now(TZ)
-    ref_time = datetime.combine(now.date(), time(0, 1), tzinfo=TZ)
-    if now < ref_time:
-        # Si aún no son las 7:10, usar el día anterior
-        ref_time -= timedelta(days=1)
-    return ref_time.strftime("%Y%m%d")
+    # Solo mantenemos en memoria el snapshot actual y el de inicio del día
+    store.prune([store.day_start(actual.fetched_at), actual])
+    return actual
 
-# ==============================
-# CARGA DE DATOS
-# ==============================
-@st.cache_data
-def load_data(dummy_key: str):
-    token = get_biwenger_token(EMAIL, PASSWORD)
-
-    # Liga y usuarios
-    df_liga, df_usuarios = get_league_data(LEAGUE_ID, token, USER_ID)
-
-    # Jugadores públicos
-    df_players_public = get_public_players()
-
-    # Jugadores de cada usuario
-    df_all_owned = pd.DataFrame()
-    for _, user in df_usuarios.iterrows():
-        df_user_players = get_user_players(USER_ID, user["id"], LEAGUE_ID, token)
-        df_all_owned = pd.concat([df_all_owned, df_user_players], ignore_index=True)
-
-    # Join: unir jugadores públicos con propietarios
-    df_jugadores = df_players_public.merge(df_all_owned, on="id", how="left")
-    df_jugadores = df_jugadores.merge(
-        df_usuarios[["id", "nombre", "imagen"]],
-        left_on="propietario_id",
-        right_on="id",
-        how="left",
-        suffixes=("", "_usuario")
-    )
-    df_jugadores.drop(columns=["id_usuario"], inplace=True)
-
-    # Clausulas ejecutadas
-    df_clausulas = obtener_clausulas_ejecutadas(LEAGUE_ID, USER_ID, token, limit=50)
-
-    return df_liga, df_usuarios, df_jugadores, df_clausulas
 
-# 🟢 Cargar datos
-df_liga, df_usuarios, df_jugadores, df_clausulas = load_data(next_refresh_key())
+@st.cache_resource(max_entries=2 * len(LIGAS))
+def datos_preparados(clave_liga: str, snapshot_id: str, snapshot_diario_id: str, _actual, _diario) -> DatosPreparados:
+    """Preprocesado una sola vez por par de snapshots, identificado por sus ids (sin hashear frames)."""
+    return preparar(_actual, _diario, TZ, history=get_snapshot_store(clave_liga).history)
 
-_, _, df_jugadores_diario, _ = load_data(daily_refresh_key())
 
-# --- Preprocesamiento jugadores ---
-df_jugadores["valor_actual"] = pd.to_numeric(df_jugadores["valor_actual"], errors="coerce")
-df_jugadores_diario["valor_actual"] = pd.to_numeric(df_jugadores_diario["valor_actual"], errors="coerce")
+start_metrics()
 
-# 👇 Ajustamos fecha_desbloqueo: asumimos que viene en UTC de la API
-df_jugadores["fecha_desbloqueo"] = pd.to_datetime(
-    df_jugadores["fecha_desbloqueo"], errors="coerce", utc=True
-).dt.tz_convert(TZ)
+# 🟢 Liga de esta sesión
+if len(LIGAS) > 1:
+    clave_liga = st.sidebar.selectbox("Liga", list(LIGAS), format_func=lambda clave: LIGAS[clave].nombre)
+else:
+    clave_liga = next(iter(LIGAS))
 
-df_jugadores_diario["fecha_desbloqueo"] = pd.to_datetime(
-    df_jugadores_diario["fecha_desbloqueo"], errors="coerce", utc=True
-).dt.tz_convert(TZ)
+# Cuadrícula paginada (solo se envía la página visible) o tablas HTML completas
+modo_grid = st.sidebar.toggle("Tablas paginadas", value=True)
+orden_sin_horas = {k: v for k, v in ORDEN_CLAUSULAS.items() if k != "Horas Restantes"}
 
-df_jugadores_diario["variacion_diaria"] = pd.to_numeric(df_jugadores["variacion_diaria"], errors="coerce")
-df_jugadores_diario["variacion_diaria"] = pd.to_numeric(df_jugadores["variacion_diaria"], errors="coerce")
+# 🟢 Cargar datos
+store = get_snapshot_store(clave_liga)
+snap_actual = snapshot_actual(clave_liga)
+if snap_actual is None:
+    st.warning("Todavía no hay datos publicados: arranca fetcher.py para descargarlos.")
+    st.stop()
 
-# ==============================
-# FUNCIONES EXTRA
-# ==============================
-@st.cache_data
-def clausulas_abiertas_hoy(df_jugadores: pd.DataFrame, clave_dia: str):
-    """Jugadores cuya cláusula se abre o está abierta en el día actual."""
-    ahora = pd.Timestamp.now(tz=TZ)
-    # mañana = ahora + pd.Timedelta(days=1)
-
-    hoy = ahora.normalize()
-
-    filtro = df_jugadores[df_jugadores["fecha_desbloqueo"].notna()]# excluye NaT y NaN
-    # resultado = df_jugadores.loc[filtro, "fecha_desbloqueo"]
-    df_hoy = filtro[
-        (filtro["fecha_desbloqueo"].dt.date == hoy.date())
-    ].copy()
-    print(hoy.date())
-    # print("hola")
-    # print(filtro["fecha_desbloqueo"].dt.date)
-    # print(df_hoy)
-    return df_hoy
+# Vista de inicio del día: primer snapshot tras las 00:01, sin segunda descarga
+snap_diario = store.day_start(datetime.now(TZ)) or snap_actual
+
+# --- Preprocesamiento (una vez por snapshot) ---
+# Los ids de snapshot son marcas de tiempo: se prefijan con la liga para no mezclar cachés
+snapshot_key = f"{clave_liga}/{snap_actual.id}"
+snapshot_diario_key = f"{clave_liga}/{snap_diario.id}"
+datos = datos_preparados(clave_liga, snapshot_key, snapshot_diario_key, snap_actual, snap_diario)
 
 # --- Tabs ---
-tab1, tab5, tab3, tab2, tab4, tab6 = st.tabs([
-    "⏳ Cláusulas próximas",
-    "🔨 Clausulazos recibidos < 7 días",
-    "📝 Cláusulas desbloqueadas",
-    "📊 Estadísticas por propietario",
-    "📈 Gráficas adicionales",
-    "📅 Cláusulas de hoy"
-])
+# Cada pestaña es un fragmento: sus widgets solo vuelven a ejecutar esa pestaña,
+# y solo se ejecuta la pestaña abierta (las demás no se calculan en cada rerun).
 # -----------------------------------------------------------------
 # TAB 1: Cláusulas próximas
 # -----------------------------------------------------------------
-with tab1:
-    st.subheader("Filtros de cláusulas próximas")
-    col1, col2, col3 = st.columns(3)
-
-    propietarios = ["Todos"] + sorted(df_usuarios["nombre"].unique())
-    propietario_sel = col1.selectbox("Filtrar por propietario", propietarios)
-    tiempo_max = col2.slider("Tiempo máximo restante (horas)", 0, 48, 48)
-    posiciones = ["Todas"] + sorted(df_jugadores["posicion"].dropna().unique())
-    posicion_sel = col3.selectbox("Filtrar por posición", posiciones)
-
-    df_tab1 = df_jugadores.copy()
-    df_tab1["Horas_restantes"] = (df_tab1["fecha_desbloqueo"] - pd.Timestamp.now(tz=TZ)).dt.total_seconds()/3600
-    df_tab1 = df_tab1[df_tab1["Horas_restantes"] <= tiempo_max]
-    if propietario_sel != "Todos":
-        df_tab1 = df_tab1[df_tab1["nombre"] == propietario_sel]
-    if posicion_sel != "Todas":
-        df_tab1 = df_tab1[df_tab1["posicion"] == posicion_sel]
-
-    df_tab1["Valor Cláusula"] = df_tab1["valor_clausula"].apply(lambda x: f"{int(x):,}".replace(",", ".")) if "valor_clausula" in df_tab1 else "-"
-    df_tab1["Valor Actual"] = df_tab1["valor_actual"].apply(lambda x: f"{int(x):,}".replace(",", "."))
-    df_tab1["Puntos"] = df_tab1["puntos"].apply(lambda x: f"{int(x):,}".replace(",", "."))
-    df_tab1["Horas Restantes"] = df_tab1["Horas_restantes"].apply(lambda x: f"{int(x)}h")
-
-    df_tab1["Foto Jugador"] = df_tab1["enlace_imagen"].apply(lambda x: f'<div style="text-align:center"><img src="{x}" height="50"></div>')
-    df_tab1["Icono Propietario"] = df_tab1["imagen"].apply(lambda x: f'<div style="text-align:center"><img src="{x}" height="50"></div>')
-    df_tab1["fecha_desbloqueo"] = df_tab1["fecha_desbloqueo"].dt.strftime("%d/%m/%Y %H:%M")
-    cols_mostrar = ["Foto Jugador", "nombre", "equipo", "posicion", "nombre", "Icono Propietario", "Valor Cláusula", "Valor Actual", "Puntos", "Horas Restantes", "fecha_desbloqueo"]
-    cols_renombrar = {"nombre": "Propietario", "equipo": "Equipo", "posicion": "Posición", "fecha_desbloqueo": "Fecha Desbloqueo"}
-
-    st.write(df_tab1[cols_mostrar].rename(columns=cols_renombrar).to_html(escape=False, index=False), unsafe_allow_html=True)
+@st.fragment
+def tab_proximas(datos: DatosPreparados, snapshot_key: str):
+    with span("tab.proximas"):
+        st.subheader("Filtros de cláusulas próximas")
+        col1, col2, col3 = st.columns(3)
+
+        propietarios = ["Todos"] + sorted(datos.usuarios["nombre"].unique())
+        propietario_sel = col1.selectbox("Filtrar por propietario", propietarios)
+        tiempo_max = col2.slider("Tiempo máximo restante (horas)", 0, 48, 48)
+        posiciones = ["Todas"] + sorted(datos.jugadores["posicion"].dropna().unique())
+        posicion_sel = col3.selectbox("Filtrar por posición", posiciones)
+
+        ahora = pd.Timestamp.now(tz=TZ)
+        df_tab1 = datos.desbloqueos.hasta_horas(ahora, tiempo_max)
+        df_tab1 = df_tab1.assign(Horas_restantes=horas_restantes(df_tab1, ahora))
+        if propietario_sel != "Todos":
+            df_tab1 = df_tab1[df_tab1["nombre_usuario"] == propietario_sel]
+        if posicion_sel != "Todas":
+            df_tab1 = df_tab1[df_tab1["posicion"] == posicion_sel]
+
+        if modo_grid:
+            grid_paginado(
+                df_tab1, "proximas", lambda filas: tabla_clausulas(filas, horas_restantes=True, html=False),
+                ORDEN_CLAUSULAS, "Horas Restantes",
+            )
+        else:
+            filtros = (propietario_sel, tiempo_max, posicion_sel, ahora.strftime("%Y%m%d%H%M"))
+            st.write(tabla_clausulas_html(df_tab1, snapshot_key, "proximas", filtros, horas_restantes=True), unsafe_allow_html=True)
+
 
 # -----------------------------------------------------------------
 # TAB 2: Estadísticas por propietario
 # -----------------------------------------------------------------
-colores_manual = [
-    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
-    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"
-]
+@st.fragment
+def tab_propietarios(datos: DatosPreparados, snapshot_key: str):
+    with span("tab.propietarios"):
+        from charts import figuras_propietarios
+
+        st.subheader("🏅 Clasificación y puntos del mejor once posible")
+        st.dataframe(clasificacion(datos.usuarios, datos.onces.resumen), hide_index=True)
+        st.caption("Puntos Máximos: puntos de temporada del mejor once que se puede alinear con la plantilla actual")
+        with st.expander("Ver mejor once de un propietario"):
+            usuario = st.selectbox("Propietario", datos.usuarios.sort_values("posicion")["nombre"], key="once_propietario")
+            propietario_id = datos.usuarios.loc[datos.usuarios["nombre"] == usuario, "id"].iloc[0]
+            once = datos.jugadores[datos.onces.titular]
+            once = once[once["propietario_id"] == propietario_id]
+            st.dataframe(once.sort_values(["posicion", "puntos"], ascending=[True, False])[["nombre", "posicion", "equipo", "puntos"]], hide_index=True)
+
+        fig_valor, fig_incremento = figuras_propietarios(snapshot_key, datos.jugadores, datos.usuarios)
+        st.subheader("💰 Valor total de jugadores por propietario (millones)")
+        st.plotly_chart(fig_valor, use_container_width=True, config={"displayModeBar": False})
+        st.subheader("📈 Incremento diario del valor del equipo (millones)")
+        st.plotly_chart(fig_incremento, use_container_width=True, config={"displayModeBar": False})
+
+        # Solo el conjunto de cambios respecto al inicio del día, no los dos snapshots
+        st.subheader("🔄 Traspasos desde el inicio del día")
+        cambios = datos.cambios
+        df_traspasos = transferencias(cambios, datos.usuarios)
+        if df_traspasos.empty:
+            st.info("No hay traspasos desde el inicio del día")
+        else:
+            st.dataframe(df_traspasos.drop(columns="id"), hide_index=True)
+        st.caption(
+            f"{int(cambios['cambio_clausula'].sum())} cláusulas modificadas · "
+            f"{int(cambios['cambio_cesion'].sum())} cesiones nuevas o terminadas"
+        )
 
-# Crear mapping de colores por propietario_id (como string)
-usuarios_ids = sorted(df_usuarios["id"].astype(int).astype(str).unique())
-color_map_id = {uid: colores_manual[i % len(colores_manual)] for i, uid in enumerate(usuarios_ids)}
 
-with tab2:
-    st.subheader("💰 Valor total de jugadores por propietario (millones)")
-    valor_por_propietario = (
-        df_jugadores.groupby(["nombre_usuario", "propietario_id"])["valor_actual"]
-        .sum()
-        .reset_index()
-    )
-    valor_por_propietario["Valor (M)"] = valor_por_propietario["valor_actual"] / 1_000_000
-    valor_por_propietario["propietario_id_str"] = valor_por_propietario["propietario_id"].astype(int).astype(str)
-
-    # Orden descendente por Valor (M)
-    valor_por_propietario = valor_por_propietario.sort_values("Valor (M)", ascending=False)
-
-    # Forzar el orden de x según el valor
-    fig_valor = px.bar(
-        valor_por_propietario,
-        x="nombre_usuario",
-        y="Valor (M)",
-        text=valor_por_propietario["Valor (M)"].map(lambda x: f"{x:.1f}M"),
-        color="propietario_id_str",
-        color_discrete_map=color_map_id,
-        category_orders={"nombre_usuario": valor_por_propietario["nombre_usuario"].tolist()},
-        labels={"nombre_usuario": "Propietario", "Valor (M)": "Valor total (millones)"}
-    )
-    fig_valor.update_traces(textposition="outside")
-    fig_valor.update_layout(
-        margin=dict(t=100),
-        yaxis=dict(range=[0, valor_por_propietario["Valor (M)"].max() * 1.15]),
-        showlegend=False,
-        dragmode=False
-    )
-    st.plotly_chart(fig_valor, use_container_width=True, config={"displayModeBar": False})
-
-    st.subheader("📈 Incremento diario del valor del equipo (millones)")
-    incremento_por_propietario = (
-        df_jugadores.groupby(["nombre_usuario", "propietario_id"])["variacion_diaria"]
-        .sum()
-        .reset_index()
-    )
-    incremento_por_propietario["Incremento (M)"] = incremento_por_propietario["variacion_diaria"] / 1_000_000
-    incremento_por_propietario["propietario_id_str"] = incremento_por_propietario["propietario_id"].astype(int).astype(str)
-
-    # Orden descendente por Incremento (M)
-    incremento_por_propietario = incremento_por_propietario.sort_values("Incremento (M)", ascending=False)
-
-    # Forzar el orden de x según el valor
-    fig_incremento = px.bar(
-        incremento_por_propietario,
-        x="nombre_usuario",
-        y="Incremento (M)",
-        text=incremento_por_propietario["Incremento (M)"].map(lambda x: f"{x:.2f}M"),
-        color="propietario_id_str",
-        color_discrete_map=color_map_id,
-        category_orders={"nombre_usuario": incremento_por_propietario["nombre_usuario"].tolist()},
-        labels={"nombre_usuario": "Propietario", "Incremento (M)": "Incremento diario (millones)"}
-    )
-    fig_incremento.update_traces(textposition="outside")
-    fig_incremento.update_layout(
-        margin=dict(t=100),
-        yaxis=dict(
-            range=[
-                incremento_por_propietario["Incremento (M)"].min() * 1.15,
-                incremento_por_propietario["Incremento (M)"].max() * 1.15
-            ]
-        ),
-        showlegend=False,
-        dragmode=False
-    )
-    st.plotly_chart(fig_incremento, use_container_width=True, config={"displayModeBar": False})
+# -----------------------------------------------------------------
+# TAB 3: Cláusulas desbloqueadas
+# -----------------------------------------------------------------
+@st.fragment
+def tab_desbloqueadas(datos: DatosPreparados, snapshot_key: str):
+    with span("tab.desbloqueadas"):
+        st.subheader("Jugadores con cláusula desbloqueada recientemente")
+        now = pd.Timestamp.now(tz=TZ)
+        df_tab3 = datos.desbloqueos.antes_de(now)
+        if modo_grid:
+            grid_paginado(
+                df_tab3, "desbloqueadas", lambda filas: tabla_clausulas(filas, html=False),
+                orden_sin_horas, "Fecha Desbloqueo",
+            )
+        else:
+            st.write(tabla_clausulas_html(df_tab3, snapshot_key, "desbloqueadas", (now.strftime("%Y%m%d%H%M"),)), unsafe_allow_html=True)
 
 
 # -----------------------------------------------------------------
-# TAB 3: Cláusulas desbloqueadas
+# TAB 7: Optimizador de cláusulas
 # -----------------------------------------------------------------
-with tab3:
-    st.subheader("Jugadores con cláusula desbloqueada recientemente")
-    now = pd.Timestamp.now(tz=TZ)
-    df_tab3 = df_jugadores[df_jugadores["fecha_desbloqueo"].notna() & (df_jugadores["fecha_desbloqueo"] < now)].copy()
-    df_tab3["Valor Cláusula"] = df_tab3["valor_clausula"].apply(lambda x: f"{int(x):,}".replace(",", "."))
-    df_tab3["Valor Actual"] = df_tab3["valor_actual"].apply(lambda x: f"{int(x):,}".replace(",", "."))
-    df_tab3["Puntos"] = df_tab3["puntos"].apply(lambda x: f"{int(x):,}".replace(",", "."))
-    df_tab3["Foto Jugador"] = df_tab3["enlace_imagen"].apply(lambda x: f'<div style="text-align:center"><img src="{x}" height="50"></div>')
-    df_tab3["Icono Propietario"] = df_tab3["imagen"].apply(lambda x: f'<div style="text-align:center"><img src="{x}" height="50"></div>')
-    df_tab3["fecha_desbloqueo"] = df_tab3["fecha_desbloqueo"].dt.strftime("%d/%m/%Y %H:%M")
-    cols_mostrar = ["Foto Jugador", "nombre", "equipo", "posicion", "nombre", "Icono Propietario", "Valor Cláusula", "Valor Actual", "Puntos", "fecha_desbloqueo"]
-    cols_renombrar = {"nombre": "Propietario", "equipo": "Equipo", "posicion": "Posición", "fecha_desbloqueo": "Fecha Desbloqueo"}
-    st.write(df_tab3[cols_mostrar].rename(columns=cols_renombrar).to_html(escape=False, index=False), unsafe_allow_html=True)
+@st.fragment
+def tab_optimizador(datos: DatosPreparados, user_id: str):
+    with span("tab.optimizador"):
+        st.subheader("🎯 Mejor combinación de cláusulas para tu presupuesto")
+        col1, col2, col3 = st.columns(3)
+        presupuesto = col1.number_input("Presupuesto (M€)", min_value=0.0, value=20.0, step=0.5)
+        objetivo = col2.selectbox("Maximizar", list(OBJETIVOS))
+        horas = col3.slider("Incluir cláusulas que se desbloquean en (horas)", 0, 48, 0)
+
+        columnas = st.columns(len(LIMITES_POSICION))
+        max_por_posicion = {
+            posicion: col.number_input(f"Máx. {posicion.lower()}s", 0, MAX_POR_POSICION, limite)
+            for col, (posicion, limite) in zip(columnas, LIMITES_POSICION.items())
+        }
+
+        # Los propietarios con 3 clausulazos esta semana quedan fuera; el resto, con los que les quedan
+        ahora = pd.Timestamp.now(tz=TZ)
+        df_candidatos = candidatos(datos.desbloqueos.hasta_horas(ahora, horas), user_id)
+        recibidos = clausulazos_por_propietario(datos.clausulas, ahora)
+        seleccion = optimizar(
+            df_candidatos, int(presupuesto * 1_000_000), OBJETIVOS[objetivo], max_por_posicion, recibidos
+        )
+
+        if seleccion.jugadores.empty:
+            st.info("No hay ninguna combinación de cláusulas que quepa en el presupuesto")
+            return
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Jugadores", len(seleccion.jugadores))
+        c2.metric("Coste total", f"{seleccion.coste / 1_000_000:.2f}M")
+        c3.metric(objetivo, f"{seleccion.valor / 1_000_000:.2f}M" if OBJETIVOS[objetivo] != "puntos" else f"{seleccion.valor:.0f}")
+        if seleccion.aproximada:
+            st.caption("Selección aproximada: los costes se redondean hacia arriba, así que alguna combinación que apure más el presupuesto podría ser algo mejor.")
+        st.dataframe(
+            tabla_clausulas(seleccion.jugadores, html=False), hide_index=True,
+            column_config={c: st.column_config.ImageColumn(c) for c in COLUMNAS_IMAGEN},
+        )
+
 
 # -----------------------------------------------------------------
 # TAB 4: Gráficas adicionales
 # -----------------------------------------------------------------
-with tab4:
-    st.subheader("🏆 Top 10 jugadores por valor")
-    top_jugadores = df_jugadores.sort_values("valor_actual", ascending=False).head(10)
-    st.dataframe(top_jugadores[["nombre", "equipo", "valor_actual", "puntos"]])
+@st.fragment
+def tab_graficas(datos: DatosPreparados, snapshot_key: str):
+    with span("tab.graficas"):
+        from charts import figura_valor_posicion
+
+        st.subheader("🏆 Top 10 jugadores por valor")
+        columnas_top = ["nombre", "equipo", "valor_actual", "valor_previsto", "variacion_prevista", "puntos"]
+        if modo_grid:
+            grid_paginado(
+                datos.jugadores, "top", lambda filas: filas[columnas_top],
+                {
+                    "Valor Actual": "valor_actual", "Valor Previsto": "valor_previsto",
+                    "Variación Prevista": "variacion_prevista", "Puntos": "puntos", "Jugador": "nombre", "Equipo": "equipo",
+                },
+                ascendente=False, tamanos=(10, 25, 50, 100),
+            )
+        else:
+            top_jugadores = datos.jugadores.nlargest(10, "valor_actual")
+            st.dataframe(top_jugadores[columnas_top])
+
+        st.subheader("📊 Valor medio por posición")
+        st.plotly_chart(figura_valor_posicion(snapshot_key, datos.jugadores), use_container_width=True)
 
-    st.subheader("📊 Valor medio por posición")
-    valor_pos = df_jugadores.groupby("posicion")["valor_actual"].mean().reset_index()
-    valor_pos["Valor (M)"] = valor_pos["valor_actual"]/1_000_000
-    fig_pos = px.bar(valor_pos, x="posicion", y="Valor (M)", text=valor_pos["Valor (M)"].map(lambda x: f"{x:.2f}M"))
-    fig_pos.update_traces(textposition="outside")
-    st.plotly_chart(fig_pos, use_container_width=True)
 
 # -----------------------------------------------------------------
 # TAB 5: Clausulazos recibidos
 # -----------------------------------------------------------------
-with tab5:
-    st.subheader("Clausulazos recibidos por propietario en los últimos 7 días")
-    fecha_limite = pd.Timestamp.now(tz=TZ) - pd.Timedelta(days=7, hours=2)
-    df_clausulas["entry_date"] = pd.to_datetime(df_clausulas["entry_date"], utc=True).dt.tz_convert(TZ)
-    df_recientes = df_clausulas[df_clausulas["entry_date"] >= fecha_limite]
-    clausulas_recibidas = df_recientes.groupby("from_id").size().reset_index(name="Recibidos")
-    clausulas_recibidas["Recibidos"] = clausulas_recibidas["Recibidos"].clip(upper=3)
-    df_tab5 = df_usuarios[["id", "nombre"]].merge(clausulas_recibidas, left_on="id", right_on="from_id", how="left").fillna(0)
-    df_tab5["Recibidos"] = df_tab5["Recibidos"].astype(int)
-    df_tab5["Restantes"] = 3 - df_tab5["Recibidos"]
-    df_tab5 = df_tab5.drop(columns=["from_id", "id"]).reset_index(drop=True)
-    df_tab5 = df_tab5.rename(columns={"nombre": "Nombre"})
-
-    def color_fila(row):
-        pastel = {0: "#a8ddb5", 1: "#ffe699", 2: "#ffb366", 3: "#f77f7f"}
-        color = pastel.get(row["Recibidos"], "#cccccc")
-        return [f'background-color: {color}; color: black; text-align:center; font-weight:bold;' for _ in row]
-
-    styled_df = df_tab5.style.apply(color_fila, axis=1)
-    html_table = styled_df.to_html().replace("</div>", "")
-    st.markdown(f"<div style='overflow-x:auto;'>{html_table}", unsafe_allow_html=True)
+@st.fragment
+def tab_clausulazos(datos: DatosPreparados, snapshot_key: str):
+    with span("tab.clausulazos"):
+        st.subheader("Clausulazos recibidos por propietario en los últimos 7 días")
+        ahora = pd.Timestamp.now(tz=TZ).floor("min")
+        st.markdown(tabla_clausulazos_html(datos.clausulas, datos.usuarios, snapshot_key, ahora), unsafe_allow_html=True)
+
 
 # -----------------------------------------------------------------
 # TAB 6: Cláusulas de hoy
 # -----------------------------------------------------------------
-with tab6:
-    st.subheader("📅 Jugadores con cláusula abierta o desbloqueada hoy")
+@st.fragment
+def tab_hoy(datos: DatosPreparados, snapshot_key: str, snapshot_diario_key: str):
+    with span("tab.hoy"):
+        st.subheader("📅 Jugadores con cláusula abierta o desbloqueada hoy")
 
-    # 👇 Pasamos la clave diaria
-    df_hoy = clausulas_abiertas_hoy(df_jugadores_diario, daily_refresh_key())
-    now = pd.Timestamp.now(tz=TZ)
+        now = pd.Timestamp.now(tz=TZ)
+        df_hoy = datos.desbloqueos_diario.de_hoy(now)
 
-    print(df_hoy)
+        if df_hoy.empty:
+            st.info("No hay cláusulas que se hayan abierto hoy")
+        elif modo_grid:
+            grid_paginado(df_hoy, "hoy", lambda filas: tabla_clausulas(filas, html=False), orden_sin_horas, "Fecha Desbloqueo")
+        else:
+            filtros = (snapshot_key, now.strftime("%Y%m%d%H%M"))
+            st.write(tabla_clausulas_html(df_hoy, snapshot_diario_key, "hoy", filtros), unsafe_allow_html=True)
 
-    df_hoy = df_hoy[df_hoy["fecha_desbloqueo"].notna() & (df_hoy["fecha_desbloqueo"] < now)].copy()
 
+tab1, tab5, tab3, tab7, tab2, tab4, tab6 = st.tabs([
+    "⏳ Cláusulas próximas",
+    "🔨 Clausulazos recibidos < 7 días",
+    "📝 Cláusulas desbloqueadas",
+    "🎯 Optimizador de cláusulas",
+    "📊 Estadísticas por propietario",
+    "📈 Gráficas adicionales",
+    "📅 Cláusulas de hoy"
+], key="pestana", on_change="rerun")
 
-    if df_hoy.empty:
-        st.info("No hay cláusulas que se hayan abierto hoy")
-    else:
-        df_hoy["Valor Cláusula"] = df_hoy["valor_clausula"].apply(lambda x: f"{int(x):,}".replace(",", "."))
-        df_hoy["Valor Actual"] = df_hoy["valor_actual"].apply(lambda x: f"{int(x):,}".replace(",", "."))
-        df_hoy["Puntos"] = df_hoy["puntos"].apply(lambda x: f"{int(x):,}".replace(",", "."))
-        df_hoy["Foto Jugador"] = df_hoy["enlace_imagen"].apply(lambda x: f'<div style="text-align:center"><img src="{x}" height="50"></div>')
-        df_hoy["Icono Propietario"] = df_hoy["imagen"].apply(lambda x: f'<div style="text-align:center"><img src="{x}" height="50"></div>')
-        df_hoy["fecha_desbloqueo"] = df_hoy["fecha_desbloqueo"].dt.strftime("%d/%m/%Y %H:%M")
-        cols_mostrar = ["Foto Jugador", "nombre", "equipo", "posicion", "nombre", "Icono Propietario", "Valor Cláusula", "Valor Actual", "Puntos", "fecha_desbloqueo"]
-        cols_renombrar = {"nombre": "Propietario", "equipo": "Equipo", "posicion": "Posición", "fecha_desbloqueo": "Fecha Desbloqueo"}
-        st.write(df_hoy[cols_mostrar].rename(columns=cols_renombrar).to_html(escape=False, index=False), unsafe_allow_html=True)
+# Solo se ejecuta la pestaña abierta; al cambiar de pestaña se hace un rerun
+with tab1:
+    if tab1.open:
+        tab_proximas(datos, snapshot_key)
+with tab5:
+    if tab5.open:
+        tab_clausulazos(datos, snapshot_key)
+with tab3:
+    if tab3.open:
+        tab_desbloqueadas(datos, snapshot_key)
+with tab7:
+    if tab7.open:
+        tab_optimizador(datos, LIGAS[clave_liga].user_id)
+with tab2:
+    if tab2.open:
+        tab_propietarios(datos, snapshot_key)
+with tab4:
+    if tab4.open:
+        tab_graficas(datos, snapshot_key)
+with tab6:
+    if tab6.open:
+        tab_hoy(datos, snapshot_key, snapshot_diario_key)
+
+# -----------------------------------------------------------------
+# PANEL DE DEPURACIÓN (oculto, se activa con ?debug=1)
+# -----------------------------------------------------------------
+if st.query_params.get("debug") == "1":
+    with st.expander("🛠️ Tiempos por etapa", expanded=True):
+        st.caption(f"Snapshots en memoria ({clave_liga}): {store.memoria / 1e6:.1f} MB")
+        spans = metrics.metrics.recientes(200)
+        if spans:
+            st.dataframe(pd.DataFrame(spans)[["name", "duration_ms", "bytes", "rows", "cache", "start"]].iloc[::-1])
+        st.code(metrics.metrics.to_prometheus(), language="text")
@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from clause_optimizer import MAX_CLAUSULAZOS, clausulazos_por_propietario
+
+try:
+    from st_aggrid import AgGrid, GridOptionsBuilder, JsCode
+except ImportError:  # sin streamlit-aggrid la cuadrícula usa st.dataframe
+    AgGrid = None
+
+# Separador de miles al estilo español (1.234.567)
+_MILES = r"\B(?=(\d{3})+(?!\d))"
+
+# Filas por página de la cuadrícula
+TAM_PAGINA = (25, 50, 100)
+
+# Columnas que contienen URLs de imagen en modo cuadrícula
+COLUMNAS_IMAGEN = ("Foto Jugador", "Icono Propietario")
+
+# Columna mostrada -> columna original por la que se ordena en el servidor
+ORDEN_CLAUSULAS = {
+    "Fecha Desbloqueo": "fecha_desbloqueo",
+    "Horas Restantes": "Horas_restantes",
+    "Valor Cláusula": "valor_clausula",
+    "Valor Actual": "valor_actual",
+    "Valor Previsto": "valor_previsto",
+    "Puntos": "puntos",
+    "Jugador": "nombre",
+    "Equipo": "equipo",
+    "Posición": "posicion",
+    "Propietario": "nombre_usuario",
+}
+
+
+# ==============================
+# FORMATO POR COLUMNAS
+# ==============================
+def formato_miles(serie: pd.Series) -> pd.Series:
+    """Enteros con punto como separador de miles, formateando la columna entera de una vez."""
+    texto = pd.to_numeric(serie, errors="coerce").round().astype("Int64").astype("string")
+    return texto.str.replace(_MILES, ".", regex=True).fillna("-")
+
+
+def formato_horas(serie: pd.Series) -> pd.Series:
+    horas = pd.Series(np.trunc(serie.to_numpy(dtype="float64", na_value=np.nan)), index=serie.index)
+    return (horas.astype("Int64").astype("string") + "h").fillna("-")
+
+
+def imagen_html(urls: pd.Series, alto: int = 50) -> pd.Series:
+    """Envuelve una columna de URLs en etiquetas <img> centradas."""
+    return '<div style="text-align:center"><img src="' + urls.astype("string").fillna("") + f'" height="{alto}"></div>'
+
+
+# ==============================
+# TABLAS DE CLÁUSULAS
+# ==============================
+def tabla_clausulas(df: pd.DataFrame, horas_restantes: bool = False, html: bool = True) -> pd.DataFrame:
+    """Tabla lista para mostrar con las columnas comunes de las pestañas de cláusulas.
+
+    Con `html=False` las imágenes quedan como URL para que las pinte la cuadrícula.
+    """
+    imagen = imagen_html if html else (lambda urls: urls.astype("string"))
+    tabla = pd.DataFrame({
+        "Foto Jugador": imagen(df["enlace_imagen"]),
+        "Jugador": df["nombre"],
+        "Equipo": df["equipo"],
+        "Posición": df["posicion"],
+        "Propietario": df["nombre_usuario"],
+        "Icono Propietario": imagen(df["imagen"]),
+        "Valor Cláusula": formato_miles(df["valor_clausula"]),
+        "Valor Actual": formato_miles(df["valor_actual"]),
+        "Puntos": formato_miles(df["puntos"]),
+    })
+    if "valor_previsto" in df:
+        tabla.insert(tabla.columns.get_loc("Valor Actual") + 1, "Valor Previsto", formato_miles(df["valor_previsto"]))
+    if horas_restantes:
+        tabla["Horas Restantes"] = formato_horas(df["Horas_restantes"])
+    if "fecha_desbloqueo_fmt" in df:
+        tabla["Fecha Desbloqueo"] = df["fecha_desbloqueo_fmt"]
+    else:
+        tabla["Fecha Desbloqueo"] = df["fecha_desbloqueo"].dt.strftime("%d/%m/%Y %H:%M")
+    return tabla
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def tabla_clausulas_html(_df: pd.DataFrame, snapshot_id: str, vista: str, filtros: tuple, horas_restantes: bool = False) -> str:
+    """HTML de la tabla de cláusulas, cacheado por snapshot, pestaña y valores de los filtros.
+
+    `_df` no se hashea: la clave son `snapshot_id`, `vista` y `filtros`, que
+    deben identificar de forma única el contenido filtrado.
+    """
+    return tabla_clausulas(_df, horas_restantes).to_html(escape=False, index=False)
+
+
+# ==============================
+# CLAUSULAZOS RECIBIDOS
+# ==============================
+_COLOR_RECIBIDOS = {0: "#a8ddb5", 1: "#ffe699", 2: "#ffb366", 3: "#f77f7f"}
+
+
+def clausulazos_recibidos(df_clausulas: pd.DataFrame, df_usuarios: pd.DataFrame, ahora: pd.Timestamp) -> pd.DataFrame:
+    """Clausulazos recibidos y restantes por propietario en los últimos 7 días."""
+    clausulas_recibidas = clausulazos_por_propietario(df_clausulas, ahora).reset_index(name="Recibidos")
+    df = df_usuarios[["id", "nombre"]].merge(clausulas_recibidas, left_on="id", right_on="from_id", how="left").fillna(0)
+    df["Recibidos"] = df["Recibidos"].astype(int)
+    df["Restantes"] = MAX_CLAUSULAZOS - df["Recibidos"]
+    df = df.drop(columns=["from_id", "id"]).reset_index(drop=True)
+    return df.rename(columns={"nombre": "Nombre"})
+
+
+def _color_fila(row):
+    color = _COLOR_RECIBIDOS.get(row["Recibidos"], "#cccccc")
+    return [f'background-color: {color}; color: black; text-align:center; font-weight:bold;' for _ in row]
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def tabla_clausulazos_html(_df_clausulas: pd.DataFrame, _df_usuarios: pd.DataFrame, snapshot_id: str,
+                           ahora: pd.Timestamp) -> str:
+    """HTML coloreado de clausulazos recibidos, cacheado por snapshot y `ahora` (redondeado a minutos)."""
+    df = clausulazos_recibidos(_df_clausulas, _df_usuarios, ahora)
+    html_table = df.style.apply(_color_fila, axis=1).to_html().replace("</div>", "")
+    return f"<div style='overflow-x:auto;'>{html_table}"
+
+
+# ==============================
+# CLASIFICACIÓN
+# ==============================
+def clasificacion(df_usuarios: pd.DataFrame, resumen_onces: pd.DataFrame) -> pd.DataFrame:
+    """Clasificación de la liga con los puntos del mejor once de cada propietario (lineups.mejores_onces)."""
+    df = df_usuarios.merge(resumen_onces, left_on="id", right_on="propietario_id", how="left").sort_values("posicion")
+    return pd.DataFrame({
+        "Pos.": df["posicion"],
+        "Propietario": df["nombre"],
+        "Puntos": df["puntos"],
+        "Puntos Máximos": df["puntos_maximos"].astype("Int64"),
+        "Mejor Formación": df["formacion"],
+    }).reset_index(drop=True)
+
+
+# ==============================
+# CUADRÍCULA PAGINADA
+# ==============================
+# Renderer de AG Grid: <img loading="lazy">, solo para las filas que se pintan
+_IMAGEN_JS = """
+class ImagenRenderer {
+    init(params) {
+        this.eGui = document.createElement("img");
+        this.eGui.loading = "lazy";
+        this.eGui.height = 40;
+        if (params.value) { this.eGui.src = params.value; }
+    }
+    getGui() { return this.eGui; }
+}
+"""
+
+
+def buscar(df: pd.DataFrame, texto: str, columna: str = "nombre") -> pd.DataFrame:
+    if not texto:
+        return df
+    return df[df[columna].str.contains(texto, case=False, regex=False, na=False)]
+
+
+def paginar(df: pd.DataFrame, orden: str, ascendente=True, pagina=1, tam_pagina=TAM_PAGINA[0]) -> pd.DataFrame:
+    """Filas de una página tras ordenar por la columna original `orden`."""
+    inicio = (pagina - 1) * tam_pagina
+    columna = df[orden]
+    if inicio == 0 and pd.api.types.is_numeric_dtype(columna) and columna.count() > tam_pagina:
+        # Primera página: basta con los k primeros, sin ordenar toda la tabla
+        k_primeros = df.nsmallest if ascendente else df.nlargest
+        return k_primeros(tam_pagina, orden, keep="first")
+    df = df.sort_values(orden, ascending=ascendente, na_position="last", kind="stable")
+    return df.iloc[inicio:inicio + tam_pagina]
+
+
+def _grid(tabla: pd.DataFrame, key: str):
+    imagenes = [c for c in COLUMNAS_IMAGEN if c in tabla]
+    if AgGrid is None:
+        config = {c: st.column_config.ImageColumn(c) for c in imagenes}
+        st.dataframe(tabla, column_config=config, hide_index=True, use_container_width=True, key=key)
+        return
+
+    gb = GridOptionsBuilder.from_dataframe(tabla)
+    # El orden y el filtro se hacen en el servidor sobre todas las filas, no sobre la página
+    gb.configure_default_column(sortable=False, filter=False, resizable=True)
+    for c in imagenes:
+        gb.configure_column(c, cellRenderer=JsCode(_IMAGEN_JS), width=70)
+    gb.configure_grid_options(rowHeight=46)
+    AgGrid(
+        tabla,
+        gridOptions=gb.build(),
+        height=min(46 * len(tabla) + 60, 620),
+        allow_unsafe_jscode=True,
+        fit_columns_on_grid_load=True,
+        key=key,
+    )
+
+
+def grid_paginado(df: pd.DataFrame, vista: str, formatear, columnas_orden: dict, orden_defecto=None,
+                  ascendente=True, tamanos=TAM_PAGINA):
+    """Cuadrícula paginada con búsqueda, orden y paginación en el servidor.
+
+    `formatear` convierte las filas de la página en la tabla a mostrar; solo
+    esa página se formatea y se envía al navegador en cada interacción.
+    """
+    # Solo se ofrecen los órdenes cuya columna existe en este frame
+    columnas_orden = {k: v for k, v in columnas_orden.items() if v in df}
+    opciones = list(columnas_orden)
+    c1, c2, c3, c4 = st.columns([3, 3, 1, 1])
+    busqueda = c1.text_input("Buscar jugador", key=f"{vista}_buscar")
+    orden = c2.selectbox(
+        "Ordenar por", opciones, index=opciones.index(orden_defecto) if orden_defecto in opciones else 0, key=f"{vista}_orden"
+    )
+    asc = c3.toggle("Ascendente", value=ascendente, key=f"{vista}_asc")
+    tam_pagina = c4.selectbox("Filas", tamanos, key=f"{vista}_filas")
+
+    # La página se lee antes de crear su control, que va debajo de la tabla
+    clave_pagina = f"{vista}_pagina"
+    df = buscar(df, busqueda)
+    total = len(df)
+    paginas = max(-(-total // tam_pagina), 1)
+    if st.session_state.get(clave_pagina, 1) > paginas:
+        st.session_state[clave_pagina] = paginas
+    pagina = st.session_state.get(clave_pagina, 1)
+
+    filas = paginar(df, columnas_orden[orden], asc, pagina, tam_pagina)
+    _grid(formatear(filas), f"{vista}_grid")
+    st.number_input(f"Página (de {paginas}, {total} filas)", 1, paginas, key=clave_pagina)
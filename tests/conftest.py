@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from fake_biwenger import FakeBiwenger, generar_liga  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def fake_api():
+    """Biwenger simulado con una liga sintética de 20 managers."""
+    fake = FakeBiwenger(generar_liga(20, 600, 60)).start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def app(fake_api, tmp_path, monkeypatch):
+    """AppTest de streamlit_app.py contra el Biwenger simulado, con histórico en tmp_path."""
+    import data_loader
+    from streamlit.testing.v1 import AppTest
+
+    monkeypatch.setattr(data_loader, "API_URL", fake_api.base_url)
+    monkeypatch.setattr(data_loader, "CF_API_URL", fake_api.base_url)
+
+    # La app lleva un st.stop() al principio del script: se prueba una copia sin él
+    fuente = (ROOT / "streamlit_app.py").read_text(encoding="utf-8").replace("st.stop()\n", "", 1)
+    copia = tmp_path / "streamlit_app.py"
+    copia.write_text(f"import sys; sys.path.insert(0, {str(ROOT)!r})\n{fuente}", encoding="utf-8")
+
+    at = AppTest.from_file(str(copia), default_timeout=120)
+    at.secrets.update({
+        "EMAIL": "a", "PASSWORD": "b", "LEAGUE_ID": "1", "USER_ID": "1000",
+        "HISTORY_DIR": str(tmp_path / "historico"), "CLAUSE_LOG_PATH": str(tmp_path / "clausulas.parquet"),
+        "HTTP_CACHE_DIR": str(tmp_path / "http_cache"),
+    })
+    return at
@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from clause_log import ClauseLog
+from data_loader import SCHEMA_CLAUSULAS
+from preprocessing import preparar
+from refresh_schedule import TZ
+from snapshots import Snapshot
+
+AHORA = 1_790_000_000
+
+
+def _entrada(date, player, origen=10, destino=11):
+    return {
+        "type": "clause", "title": "Clausulazo", "date": date, "fixed": False, "author": None,
+        "content": [{
+            "player": player, "from": {"id": origen, "name": "A"},
+            "to": {"id": destino, "name": "B", "icon": ""}, "amount": 1_000_000, "type": "clause",
+        }],
+    }
+
+
+class _Respuesta:
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"data": self._data}
+
+
+class TablonCliente:
+    """Sirve el tablón (de más reciente a más antigua) por offset/limit y anota los offsets pedidos."""
+
+    def __init__(self, entradas):
+        self.entradas = entradas
+        self.offsets = []
+
+    def get(self, url, **kwargs):
+        query = parse_qs(urlparse(url).query)
+        offset, limit = int(query["offset"][0]), int(query["limit"][0])
+        self.offsets.append(offset)
+        return _Respuesta(self.entradas[offset:offset + limit])
+
+
+def test_registro_vacio_tiene_los_tipos_del_esquema(tmp_path):
+    df = ClauseLog(tmp_path / "c.parquet").update(1, 1, "t", client=TablonCliente([]))
+    assert df.empty
+    assert df.dtypes.astype(str).to_dict() == {c: str(pd.Series(dtype=t).dtype) for c, t in SCHEMA_CLAUSULAS.items()}
+
+    # preparar no debe fallar con una liga sin cláusulas todavía
+    ahora = datetime.fromtimestamp(AHORA, tz=timezone.utc)
+    jugadores = pd.DataFrame({
+        "id": pd.array([], dtype="Int32"), "nombre": pd.array([], dtype="string"),
+        "valor_actual": pd.array([], dtype="Int64"), "variacion_diaria": pd.array([], dtype="Int64"),
+        "propietario_id": pd.array([], dtype="Int64"), "valor_clausula": pd.array([], dtype="Int64"),
+        "fecha_desbloqueo": pd.Series([], dtype="datetime64[ns, UTC]"),
+        "loan_to": pd.array([], dtype="Int64"), "loan_duration": pd.array([], dtype="Int64"),
+        "posicion": pd.array([], dtype="string"), "puntos": pd.array([], dtype="Int32"),
+    })
+    snap = Snapshot("s", ahora, pd.DataFrame(), pd.DataFrame(), jugadores, df)
+    assert preparar(snap, snap, TZ).clausulas.empty
+
+
+def test_actualizacion_incremental(tmp_path):
+    ruta = tmp_path / "c.parquet"
+    cliente = TablonCliente([_entrada(AHORA - i * 3600, player=i) for i in range(120)])
+
+    # Primera carga: recorre todas las páginas (120 entradas, páginas de 50)
+    df = ClauseLog(ruta).update(1, 1, "t", client=cliente)
+    assert len(df) == 120 and cliente.offsets == [0, 50, 100]
+    assert df["entry_date"].is_monotonic_decreasing
+
+    # Entran 3 nuevas; una comparte fecha con la más reciente guardada (límite de `since`)
+    nuevas = [
+        _entrada(AHORA + 7200, player=500),
+        _entrada(AHORA + 3600, player=501),
+        _entrada(AHORA, player=502),
+    ]
+    cliente.entradas = nuevas + cliente.entradas
+    cliente.offsets = []
+    log = ClauseLog(ruta)  # desde disco
+    df = log.update(1, 1, "t", client=cliente)
+
+    # Solo la primera página: en ella ya aparecen entradas anteriores a `since`
+    assert cliente.offsets == [0]
+    assert len(df) == 123
+    assert not df.duplicated(subset=["entry_date", "player_id", "from_id", "to_id"]).any()
+    assert set(df["player_id"].head(4)) == {500, 501, 502, 0}
+    assert (df["player_id"] == 0).sum() == 1  # la entrada del límite no se duplica
+
+    # Sin novedades: una sola petición y el registro no cambia
+    cliente.offsets = []
+    assert len(log.update(1, 1, "t", client=cliente)) == 123 and cliente.offsets == [0]
@@ -0,0 +1,72 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from clause_optimizer import LIMITES_POSICION, MAX_CLAUSULAZOS, MAX_POR_POSICION, UNIDAD, optimizar
+
+POSICIONES = list(LIMITES_POSICION)
+
+
+def _candidatos(n, seed, propietarios=6):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": range(n),
+        "posicion": pd.Categorical(rng.choice(POSICIONES, n), categories=POSICIONES, ordered=True),
+        "propietario_id": pd.array(rng.integers(1, propietarios + 1, n), dtype="Int32"),
+        "valor_clausula": pd.array(rng.integers(1, 60, n) * 1_000_000, dtype="Int64"),
+        "puntos": pd.array(rng.integers(0, 200, n), dtype="Int32"),
+    })
+
+
+def _valida(df, presupuesto, limites, recibidos):
+    if df["valor_clausula"].sum() > presupuesto:
+        return False
+    if any((df["posicion"] == p).sum() > limite for p, limite in limites.items()):
+        return False
+    por_propietario = df["propietario_id"].value_counts()
+    return all(n <= MAX_CLAUSULAZOS - recibidos.get(p, 0) for p, n in por_propietario.items())
+
+
+def _fuerza_bruta(df, presupuesto, limites, recibidos):
+    mejor = 0
+    for k in range(sum(limites.values()) + 1):
+        for filas in itertools.combinations(range(len(df)), k):
+            seleccion = df.iloc[list(filas)]
+            if _valida(seleccion, presupuesto, limites, recibidos):
+                mejor = max(mejor, int(seleccion["puntos"].sum()))
+    return mejor
+
+
+@pytest.mark.parametrize("seed", range(15))
+def test_optimo_como_fuerza_bruta(seed):
+    df = _candidatos(12, seed)
+    presupuesto = int(np.random.default_rng(seed).integers(20, 150)) * 1_000_000
+    recibidos = pd.Series({1: 2, 2: 3, 3: 1})
+    seleccion = optimizar(df, presupuesto, "puntos", LIMITES_POSICION, recibidos)
+    assert _valida(seleccion.jugadores, presupuesto, LIMITES_POSICION, recibidos.to_dict())
+    assert seleccion.valor == _fuerza_bruta(df, presupuesto, LIMITES_POSICION, recibidos.to_dict())
+    assert not seleccion.aproximada
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_limites_maximos_exactos_con_costes_en_la_unidad(seed):
+    # Costes en múltiplos de UNIDAD (no de 1M): con los límites máximos sigue siendo exacto
+    df = _candidatos(14, seed)
+    df["valor_clausula"] = pd.array(np.random.default_rng(seed).integers(10, 600, 14) * UNIDAD, dtype="Int64")
+    limites = dict.fromkeys(POSICIONES, MAX_POR_POSICION)
+    seleccion = optimizar(df, 90_000_000, "puntos", limites)
+    assert seleccion.valor == _fuerza_bruta(df, 90_000_000, limites, {})
+    assert not seleccion.aproximada
+
+
+def test_limites_maximos_respetan_presupuesto_y_limites():
+    # Costes sin unidad común y presupuesto alto: se redondea, pero la selección sigue siendo válida
+    df = _candidatos(300, 1, propietarios=20)
+    limites = dict.fromkeys(POSICIONES, MAX_POR_POSICION)
+    df["valor_clausula"] += pd.array(np.arange(300) * 1_001, dtype="Int64")  # costes sin unidad común
+    seleccion = optimizar(df, 500_000_000, "puntos", limites)
+    assert _valida(seleccion.jugadores, 500_000_000, limites, {})
+    assert len(seleccion.jugadores) == sum(limites.values())
+    assert seleccion.aproximada
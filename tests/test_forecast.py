@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from forecast import matriz_precios
+from refresh_schedule import TZ
+
+
+def test_matriz_precios_cruza_el_cambio_de_hora():
+    # Del 12/03 al 10/04 de 2026: en Europe/Madrid el día 29/03 dura 23 horas
+    ahora = datetime(2026, 4, 10, 12, tzinfo=TZ)
+    dias = 30
+    inicio = (ahora - timedelta(days=dias - 1)).astimezone(TZ)
+    fechas = pd.date_range("2026-03-12 00:30", periods=dias, freq="D", tz=TZ)
+    historico = pd.DataFrame({
+        "id": 1,
+        "valor_actual": np.arange(dias) * 1_000_000,
+        "fetched_at": fechas.tz_convert("UTC"),
+    })
+
+    matriz = matriz_precios(historico, [1], inicio, dias, TZ)
+
+    # Un precio en cada columna, en orden, y el de hoy en la última
+    np.testing.assert_array_equal(matriz[0], np.arange(dias) * 1_000_000)
@@ -0,0 +1,29 @@
+import pytest
+
+# Pestaña -> vista de grid_paginado que contiene
+PESTANAS = {
+    "⏳ Cláusulas próximas": "proximas",
+    "📝 Cláusulas desbloqueadas": "desbloqueadas",
+    "📈 Gráficas adicionales": "top",
+    "📅 Cláusulas de hoy": "hoy",
+}
+
+
+def _abrir(at, pestana):
+    # Las pestañas se abren por su clave; cada interacción vuelve a ejecutar el script entero
+    at.session_state["pestana"] = pestana
+    return at.run()
+
+
+@pytest.mark.parametrize("pestana,vista", PESTANAS.items())
+def test_grid_ordena_por_cada_opcion(app, pestana, vista):
+    at = _abrir(app.run(), pestana)
+    assert not at.exception
+    orden = at.selectbox(key=f"{vista}_orden")
+    for opcion in orden.options:
+        for ascendente in (True, False):
+            at.selectbox(key=f"{vista}_orden").set_value(opcion)
+            at.toggle(key=f"{vista}_asc").set_value(ascendente)
+            at = _abrir(at, pestana)
+            assert not at.exception, (opcion, ascendente, at.exception)
+            assert at.selectbox(key=f"{vista}_orden").value == opcion
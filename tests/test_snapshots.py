@@ -0,0 +1,73 @@
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import data_loader
+import snapshots
+from biwenger_client import BiwengerClient
+from clause_log import ClauseLog
+from fake_biwenger import FakeBiwenger, cargar_fixtures
+from pipeline import descargar_datos
+from refresh_schedule import TZ
+from snapshots import FRAMES, SnapshotHistory, SnapshotStore
+
+FIXTURES = Path(__file__).resolve().parents[1] / "fixtures"
+
+
+def _frames():
+    liga = pd.DataFrame({"id": [1], "nombre": ["Liga"]})
+    usuarios = pd.DataFrame({"id": [10, 11], "nombre": ["Ana", "Luis"]})
+    jugadores = pd.DataFrame({
+        "id": [1, 2, 3], "nombre": ["A", "B", "C"],
+        "valor_actual": pd.array([1_000_000, 2_000_000, 3_000_000], dtype="Int64"),
+        "propietario_id": pd.array([10, 11, None], dtype="Int64"),
+    })
+    clausulas = pd.DataFrame({"player_id": [1], "amount": [5_000_000]})
+    return liga, usuarios, jugadores, clausulas
+
+
+def _modificar(snap):
+    df = snap.jugadores
+    df.loc[0, "valor_actual"] = -1
+    df["nombre"] = df["nombre"].str.lower()
+    df.drop(index=1, inplace=True)
+    snap.usuarios.iloc[0, 1] = "X"
+
+
+@pytest.mark.parametrize("copia_al_escribir", [True, False])
+def test_modificar_un_frame_entregado_no_toca_el_almacen(monkeypatch, copia_al_escribir):
+    # Sin copy-on-write (pandas 2 por defecto) el almacén debe entregar copias completas
+    monkeypatch.setattr(snapshots, "_copia_al_escribir", lambda: copia_al_escribir)
+    store = SnapshotStore()
+    originales = _frames()
+    snap = store.add(datetime(2026, 10, 1, 9, tzinfo=timezone.utc), *(df.copy() for df in originales))
+
+    _modificar(snap)
+    _modificar(store.get(snap.id))
+
+    guardado = store.get(snap.id)
+    pd.testing.assert_frame_equal(guardado.jugadores, originales[2])
+    pd.testing.assert_frame_equal(guardado.usuarios, originales[1])
+
+
+def test_el_historico_devuelve_los_frames_guardados(tmp_path, monkeypatch):
+    # Frames reales de los fixtures grabados, descargados por el pipeline
+    with FakeBiwenger(cargar_fixtures(FIXTURES)) as fake:
+        monkeypatch.setattr(data_loader, "API_URL", fake.base_url)
+        monkeypatch.setattr(data_loader, "CF_API_URL", fake.base_url)
+        league_id = json.loads((FIXTURES / "league.json").read_text(encoding="utf-8"))["data"]["id"]
+        client = BiwengerClient(headers=data_loader.HEADERS_BASE)
+        frames = descargar_datos("t", league_id, 1000, client, ClauseLog(tmp_path / "clausulas.parquet"))
+    snap = SnapshotStore().add(datetime(2026, 10, 1, 9, 30, tzinfo=TZ), *frames)
+
+    history = SnapshotHistory(tmp_path / "historico", TZ)
+    history.append(snap)
+    cargado = history.load(snap.id)
+
+    assert cargado.fetched_at == snap.fetched_at
+    for nombre in FRAMES:
+        pd.testing.assert_frame_equal(getattr(cargado, nombre), getattr(snap, nombre), check_dtype=False, obj=nombre)
+    assert (cargado.liga["competicion"] == "la-liga").all()
@@ -0,0 +1,102 @@
+import base64
+import json
+import os
+import threading
+import time
+
+import requests
+
+from data_loader import get_biwenger_token
+
+# ==============================
+# CONFIGURACIÓN
+# ==============================
+# Vida asumida del token si no se puede leer su campo "exp"
+DEFAULT_TTL = 12 * 3600
+# Se renueva con este margen (segundos) antes de que caduque
+EXPIRY_MARGIN = 300
+
+
+def _jwt_expiry(token: str):
+    """Lee el campo "exp" (epoch en segundos) del payload de un JWT, o None."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp else None
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+
+# ==============================
+# GESTOR DE TOKEN
+# ==============================
+class TokenManager:
+    """Cachea el token de Biwenger en memoria (y opcionalmente en disco).
+
+    Solo se vuelve a hacer login cuando el token ha caducado o cuando una
+    petición devuelve 401. Es seguro compartirlo entre hilos y sesiones.
+    """
+
+    def __init__(self, email, password, client=None, cache_path=None, default_ttl=DEFAULT_TTL):
+        self.email = email
+        self.password = password
+        self.client = client
+        self.cache_path = cache_path
+        self.default_ttl = default_ttl
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._load_from_disk()
+
+    def _valid(self) -> bool:
+        return self._token is not None and time.time() < self._expires_at - EXPIRY_MARGIN
+
+    def _load_from_disk(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._token = data["token"]
+            self._expires_at = float(data["expires_at"])
+        except (OSError, ValueError, KeyError):
+            self._token, self._expires_at = None, 0.0
+
+    def _save_to_disk(self):
+        if not self.cache_path:
+            return
+        tmp = f"{self.cache_path}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"token": self._token, "expires_at": self._expires_at}, f)
+        os.replace(tmp, self.cache_path)
+
+    def get_token(self) -> str:
+        """Devuelve un token válido, haciendo login solo si hace falta."""
+        with self._lock:
+            if not self._valid():
+                token = get_biwenger_token(self.email, self.password, client=self.client)
+                if not token:
+                    raise RuntimeError("No se pudo obtener el token de Biwenger")
+                self._token = token
+                self._expires_at = _jwt_expiry(token) or time.time() + self.default_ttl
+                self._save_to_disk()
+            return self._token
+
+    def invalidate(self, token=None):
+        """Descarta el token actual (o solo si coincide con `token`)."""
+        with self._lock:
+            if token is None or token == self._token:
+                self._token, self._expires_at = None, 0.0
+
+    def with_token(self, fn):
+        """Ejecuta fn(token); si la API responde 401, renueva el token y reintenta una vez."""
+        token = self.get_token()
+        try:
+            return fn(token)
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 401:
+                raise
+            self.invalidate(token)
+            return fn(self.get_token())
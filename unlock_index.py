@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+
+# ==============================
+# ÍNDICE DE DESBLOQUEOS
+# ==============================
+class UnlockIndex:
+    """Índice ordenado de las fechas de desbloqueo de un frame de jugadores.
+
+    Guarda los instantes de desbloqueo (epoch en segundos) ordenados junto con
+    la posición de cada fila, de modo que las consultas por rango se resuelven
+    con búsqueda binaria y solo materializan las filas del resultado, ya
+    ordenadas por fecha de desbloqueo. Las filas sin cláusula no se indexan.
+    """
+
+    def __init__(self, df: pd.DataFrame, columna: str = "desbloqueo_s"):
+        tiempos = df[columna].to_numpy(dtype="float64", na_value=np.nan)
+        posiciones = np.flatnonzero(~np.isnan(tiempos))
+        orden = np.argsort(tiempos[posiciones], kind="stable")
+        self.tiempos = tiempos[posiciones][orden]
+        self.posiciones = posiciones[orden]
+        self._df = df
+
+    def __len__(self):
+        return len(self.tiempos)
+
+    def _filas(self, inicio: int, fin: int) -> pd.DataFrame:
+        return self._df.iloc[self.posiciones[inicio:fin]]
+
+    def entre(self, desde: pd.Timestamp, hasta: pd.Timestamp) -> pd.DataFrame:
+        """Filas con desbloqueo en [desde, hasta)."""
+        inicio = np.searchsorted(self.tiempos, desde.timestamp(), side="left")
+        fin = np.searchsorted(self.tiempos, hasta.timestamp(), side="left")
+        return self._filas(inicio, fin)
+
+    def antes_de(self, momento: pd.Timestamp) -> pd.DataFrame:
+        """Filas ya desbloqueadas en `momento` (desbloqueo estrictamente anterior)."""
+        return self._filas(0, np.searchsorted(self.tiempos, momento.timestamp(), side="left"))
+
+    def hasta_horas(self, ahora: pd.Timestamp, horas: float) -> pd.DataFrame:
+        """Filas cuyo desbloqueo llega como mucho en `horas` horas (incluye las ya desbloqueadas)."""
+        limite = ahora.timestamp() + horas * 3600
+        return self._filas(0, np.searchsorted(self.tiempos, limite, side="right"))
+
+    def de_hoy(self, ahora: pd.Timestamp) -> pd.DataFrame:
+        """Filas desbloqueadas hoy (desde las 00:00 locales de `ahora`) hasta `ahora`."""
+        return self.entre(ahora.normalize(), ahora)